@@ -1,23 +1,44 @@
 """
 FastAPI backend for drone swarm simulation.
 """
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response, WebSocket
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any
+from dataclasses import dataclass, field
 import asyncio
-from datetime import datetime
+import threading
+import itertools
+import struct
+import hashlib
+import logging
+import logging.handlers
+import queue
+from collections import OrderedDict, deque
 import math
-import json
+import time
+import orjson
 import os
+import numpy as np
+from physics import (
+    MODE_NAMES, MODE_IDLE, MODE_MOVING, MODE_DISPERSING, MODE_PATTERN, MODE_PATROL, MODE_TAIL, MODE_INTERCEPT,
+    TEAM_NAMES, TEAM_FRIENDLY, TEAM_ENEMY,
+    PATTERN_NAMES, PATTERN_NONE, PATTERN_UP_DOWN, PATTERN_LEFT_RIGHT, PATTERN_CIRCULAR,
+    SHAPE_NAMES, SHAPE_CIRCLE,
+    DRONE_SPEED, ENEMY_SPEED, SIMULATION_DT, ARRIVAL_DISTANCE_SQ,
+    step_kernel, find_collisions,
+)
 from pathlib import Path
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-app = FastAPI(title="Drone Swarm API")
+app = FastAPI(title="Drone Swarm API", default_response_class=ORJSONResponse)
 
 # Enable CORS for frontend
 app.add_middleware(
@@ -28,6 +49,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(RequestValidationError)
+async def validation_error_handler(request: Request, exc: RequestValidationError):
+    """FastAPI's default 422 body, encoded with orjson so rejected NaN/Infinity inputs echo back as null."""
+    return ORJSONResponse(status_code=422, content={"detail": jsonable_encoder(exc.errors())})
+
 # Data models
 class Drone(BaseModel):
     id: str
@@ -63,11 +89,13 @@ class Drone(BaseModel):
 class WorldState(BaseModel):
     drones: List[Drone]
     timestamp: float
+    roster: int  # Matches the roster number in /ws frames while the drone list is unchanged
+    frame_codes: Dict[str, List[str]]  # Names of the mode/team codes in /ws frames
 
 class Command(BaseModel):
     drone_ids: List[str]
-    target_x: float
-    target_y: float
+    target_x: float = Field(allow_inf_nan=False)  # Moving drones must always have a real target
+    target_y: float = Field(allow_inf_nan=False)
 
 class TaskExecution(BaseModel):
     task_name: str
@@ -93,6 +121,254 @@ class PauseCommand(BaseModel):
 class TimeControlCommand(BaseModel):
     action: str  # "reverse", "forward", "jump_back"
 
+# Per-drone columns of the simulation state: name -> (dtype, value of an empty slot).
+# NaN stands in for "no value" on optional coordinates, -1 for "no command group".
+DRONE_COLUMNS = {
+    "x": (np.float32, 0.0),
+    "y": (np.float32, 0.0),
+    "vx": (np.float32, 0.0),
+    "vy": (np.float32, 0.0),
+    "target_x": (np.float32, np.nan),
+    "target_y": (np.float32, np.nan),
+    "mode": (np.int8, MODE_IDLE),
+    "team": (np.int8, TEAM_FRIENDLY),
+    "pattern": (np.int8, PATTERN_NONE),
+    "pattern_center_x": (np.float32, 0.0),
+    "pattern_center_y": (np.float32, 0.0),
+    "pattern_range": (np.float32, 0.0),
+    "pattern_radius": (np.float32, 0.0),
+    "pattern_cos": (np.float32, 1.0),  # cos/sin of the current angle, advanced by rotation (circular)
+    "pattern_sin": (np.float32, 0.0),
+    "pattern_cos_step": (np.float32, 1.0),  # cos/sin of the per-tick angle step (circular)
+    "pattern_sin_step": (np.float32, 0.0),
+    "pattern_direction": (np.int8, 1),
+    "patrol_start_x": (np.float32, np.nan),
+    "patrol_start_y": (np.float32, np.nan),
+    "patrol_target_x": (np.float32, np.nan),
+    "patrol_target_y": (np.float32, np.nan),
+    "patrol_to_target": (np.bool_, True),
+    "tail_target_id": (object, None),
+    "tail_distance": (np.float32, 80.0),
+    "intercept_target_id": (object, None),
+    "intercept_start_x": (np.float32, np.nan),
+    "intercept_start_y": (np.float32, np.nan),
+    "base_id": (object, "base_1"),
+    "base_x": (np.float32, 0.0),
+    "base_y": (np.float32, 0.0),
+    "base_shape": (np.int8, SHAPE_CIRCLE),
+    "last_x": (np.float32, np.nan),
+    "last_y": (np.float32, np.nan),
+    "stuck_frames": (np.int16, 0),
+    "command_id": (np.int32, -1),
+}
+
+# Numeric columns share one byte block per store, widest dtype first so every column stays aligned;
+# the object (id) columns are rows of one 2D object array. Copying a store is then two copies, not one per column.
+_BLOCK_COLUMNS = sorted(
+    (name for name, (dtype, fill) in DRONE_COLUMNS.items() if dtype is not object),
+    key=lambda name: -np.dtype(DRONE_COLUMNS[name][0]).itemsize,
+)
+_OBJECT_COLUMNS = [name for name, (dtype, fill) in DRONE_COLUMNS.items() if dtype is object]
+_BLOCK_ROW_BYTES = sum(np.dtype(DRONE_COLUMNS[name][0]).itemsize for name in _BLOCK_COLUMNS)
+
+# Roster numbers are global so two different drone lists never share one, even across history restores
+_ROSTER_IDS = itertools.count(1)
+
+@dataclass
+class DroneArrays:
+    """Structure-of-Arrays drone store.
+    
+    Every entry of DRONE_COLUMNS is an attribute holding a NumPy array with
+    `capacity` slots; the first `len` slots are live and row i belongs to ids[i].
+    `roster` changes whenever drones are added or removed. The columns are views
+    into `block` (numeric) and `objects` (ids).
+    """
+    capacity: int = 64
+    len: int = 0
+    ids: List[str] = field(default_factory=list)
+    id_to_index: Dict[str, int] = field(default_factory=dict)
+    roster: int = 0
+    
+    def __post_init__(self):
+        self._allocate()
+    
+    def add(self, drone_id: str, **values) -> int:
+        """Insert (or replace) a drone and return its row index."""
+        index = self.id_to_index.get(drone_id)
+        if index is None:
+            if self.len == self.capacity:
+                self._grow(self.capacity * 2)
+            index = self.len
+            self.ids.append(drone_id)
+            self.id_to_index[drone_id] = index
+            self.len += 1
+            self.roster = next(_ROSTER_IDS)
+        for name, (dtype, fill) in DRONE_COLUMNS.items():
+            getattr(self, name)[index] = values.get(name, fill)
+        return index
+    
+    def remove(self, indices) -> None:
+        """Drop the given rows and compact the remaining drones to the front."""
+        keep = np.ones(self.len, dtype=bool)
+        keep[list(indices)] = False
+        new_len = int(keep.sum())
+        for name, (dtype, fill) in DRONE_COLUMNS.items():
+            column = getattr(self, name)
+            column[:new_len] = column[:self.len][keep]
+            column[new_len:self.len] = fill
+        self.ids = [drone_id for drone_id, kept in zip(self.ids, keep) if kept]
+        self.id_to_index = {drone_id: i for i, drone_id in enumerate(self.ids)}
+        self.len = new_len
+        self.roster = next(_ROSTER_IDS)
+    
+    def snapshot(self) -> tuple:
+        """Independent copy of the store for the history buffer (see from_snapshot)."""
+        return (self.block.copy(), self.objects.copy(), self.capacity, self.len, tuple(self.ids), self.roster)
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: tuple) -> "DroneArrays":
+        """Rebuild a store from snapshot(); the snapshot itself is left untouched."""
+        block, objects, capacity, length, ids, roster = snapshot
+        arrays = cls.__new__(cls)
+        arrays.capacity = capacity
+        arrays.len = length
+        arrays.ids = list(ids)
+        arrays.id_to_index = {drone_id: i for i, drone_id in enumerate(ids)}
+        arrays.roster = roster
+        arrays.block = block.copy()
+        arrays.objects = objects.copy()
+        arrays._bind_columns()
+        return arrays
+    
+    def _allocate(self) -> None:
+        self.block = np.empty(self.capacity * _BLOCK_ROW_BYTES, dtype=np.uint8)
+        self.objects = np.empty((len(_OBJECT_COLUMNS), self.capacity), dtype=object)
+        self._bind_columns()
+        for name, (dtype, fill) in DRONE_COLUMNS.items():
+            getattr(self, name)[:] = fill
+    
+    def _bind_columns(self) -> None:
+        offset = 0
+        for name in _BLOCK_COLUMNS:
+            dtype = DRONE_COLUMNS[name][0]
+            size = self.capacity * np.dtype(dtype).itemsize
+            setattr(self, name, self.block[offset:offset + size].view(dtype))
+            offset += size
+        for row, name in enumerate(_OBJECT_COLUMNS):
+            setattr(self, name, self.objects[row])
+    
+    def _grow(self, capacity: int) -> None:
+        live = {name: getattr(self, name)[:self.len] for name in DRONE_COLUMNS}
+        self.capacity = capacity
+        self._allocate()
+        for name, values in live.items():
+            getattr(self, name)[:self.len] = values
+
+def pattern_angle(arrays: DroneArrays, i: int) -> float:
+    """Current angle in radians of a circular enemy, recovered from its (cos, sin) state."""
+    return math.atan2(float(arrays.pattern_sin[i]), float(arrays.pattern_cos[i])) % (2 * math.pi)
+
+def pattern_data_view(arrays: DroneArrays, i: int) -> Optional[dict]:
+    """Rebuild the pattern_data dict exposed by the API for drone row i."""
+    pattern = arrays.pattern[i]
+    if pattern == PATTERN_UP_DOWN:
+        return {
+            "center_y": float(arrays.pattern_center_y[i]),
+            "range": float(arrays.pattern_range[i]),
+            "direction": int(arrays.pattern_direction[i])
+        }
+    if pattern == PATTERN_LEFT_RIGHT:
+        return {
+            "center_x": float(arrays.pattern_center_x[i]),
+            "range": float(arrays.pattern_range[i]),
+            "direction": int(arrays.pattern_direction[i])
+        }
+    if pattern == PATTERN_CIRCULAR:
+        return {
+            "center_x": float(arrays.pattern_center_x[i]),
+            "center_y": float(arrays.pattern_center_y[i]),
+            "radius": float(arrays.pattern_radius[i]),
+            "angle": pattern_angle(arrays, i)
+        }
+    return None
+
+# Sent with /world so clients decode /ws frames with the same tables as the simulation
+FRAME_CODES = {"mode": list(MODE_NAMES), "team": list(TEAM_NAMES)}
+
+def encode_state_frame(arrays: DroneArrays) -> bytes:
+    """Pack the per-tick drone kinematics into a little-endian binary /ws frame.
+    
+    Layout: uint32 drone count n, uint32 roster, then float32 x[n], y[n], vx[n], vy[n]
+    and uint8 mode[n], team[n] (codes named in FRAME_CODES), with rows in the same
+    order as /world's drones.
+    """
+    n = arrays.len
+    kinematics = np.concatenate((arrays.x[:n], arrays.y[:n], arrays.vx[:n], arrays.vy[:n])).astype("<f4")
+    return (
+        struct.pack("<II", n, arrays.roster)
+        + kinematics.tobytes()
+        + arrays.mode[:n].tobytes()
+        + arrays.team[:n].tobytes()
+    )
+
+def _optional_list(column: np.ndarray) -> list:
+    """Column values as Python floats, with NaN mapped to None."""
+    return [None if value != value else value for value in column.tolist()]
+
+def encode_world(arrays: DroneArrays) -> bytes:
+    """Encode the /world response body straight from the drone arrays."""
+    n = arrays.len
+    x, y = arrays.x[:n].tolist(), arrays.y[:n].tolist()
+    vx, vy = arrays.vx[:n].tolist(), arrays.vy[:n].tolist()
+    target_x, target_y = _optional_list(arrays.target_x[:n]), _optional_list(arrays.target_y[:n])
+    patrol_start_x, patrol_start_y = _optional_list(arrays.patrol_start_x[:n]), _optional_list(arrays.patrol_start_y[:n])
+    patrol_target_x, patrol_target_y = _optional_list(arrays.patrol_target_x[:n]), _optional_list(arrays.patrol_target_y[:n])
+    intercept_start_x, intercept_start_y = _optional_list(arrays.intercept_start_x[:n]), _optional_list(arrays.intercept_start_y[:n])
+    last_x, last_y = _optional_list(arrays.last_x[:n]), _optional_list(arrays.last_y[:n])
+    mode, team, pattern = arrays.mode[:n].tolist(), arrays.team[:n].tolist(), arrays.pattern[:n].tolist()
+    patrol_to_target = arrays.patrol_to_target[:n].tolist()
+    tail_distance = arrays.tail_distance[:n].tolist()
+    base_x, base_y = arrays.base_x[:n].tolist(), arrays.base_y[:n].tolist()
+    base_shape = arrays.base_shape[:n].tolist()
+    stuck_frames, command_id = arrays.stuck_frames[:n].tolist(), arrays.command_id[:n].tolist()
+    
+    # Same fields, in the same order, as the Drone model
+    drones = [
+        {
+            "id": arrays.ids[i],
+            "x": x[i],
+            "y": y[i],
+            "vx": vx[i],
+            "vy": vy[i],
+            "mode": MODE_NAMES[mode[i]],
+            "target_x": target_x[i],
+            "target_y": target_y[i],
+            "team": TEAM_NAMES[team[i]],
+            "pattern": PATTERN_NAMES[pattern[i]],
+            "pattern_data": pattern_data_view(arrays, i),
+            "patrol_start_x": patrol_start_x[i],
+            "patrol_start_y": patrol_start_y[i],
+            "patrol_target_x": patrol_target_x[i],
+            "patrol_target_y": patrol_target_y[i],
+            "patrol_to_target": patrol_to_target[i],
+            "tail_target_id": arrays.tail_target_id[i],
+            "tail_distance": tail_distance[i],
+            "intercept_target_id": arrays.intercept_target_id[i],
+            "intercept_start_x": intercept_start_x[i],
+            "intercept_start_y": intercept_start_y[i],
+            "base_id": arrays.base_id[i],
+            "base_x": base_x[i],
+            "base_y": base_y[i],
+            "base_shape": SHAPE_NAMES[base_shape[i]],
+            "last_x": last_x[i],
+            "last_y": last_y[i],
+            "stuck_frames": stuck_frames[i],
+            "command_id": command_id[i] if command_id[i] >= 0 else None
+        }
+        for i in range(n)
+    ]
+    return orjson.dumps({"drones": drones, "timestamp": time.time(), "roster": arrays.roster, "frame_codes": FRAME_CODES})
+
 # Base definitions
 BASES = {
     "base_1": {"x": 100, "y": 900, "shape": "circle", "name": "Circle Base"},
@@ -102,16 +378,30 @@ BASES = {
 
 # In-memory world state
 world = {
-    "drones": {},
-    "last_update": datetime.now().timestamp(),
+    "drones": DroneArrays(),  # SoA drone store
     "next_command_id": 1,  # Counter for command groups
+    "command_groups": {},  # command_id -> set of drone IDs sent with that command (until it disperses)
     "task_results": [],  # Store task execution results for UI display
     "paused": False,
     "time_direction": 1,  # 1 for forward, -1 for reverse
-    "history": [],  # List of world snapshots for time travel
-    "history_index": -1  # Current position in history (-1 = live)
+    "history": deque(),  # World snapshots for time travel, oldest first
+    "history_index": -1,  # Current position in history (-1 = live)
+    "grid": None,  # SpatialGrid of drone rows, rebuilt every tick after motion
+    "world_snapshot_bytes": b"",  # Cached /world response body
+    "snapshot_dirty": True,  # Drone state changed since world_snapshot_bytes was encoded
+    "context_cache": (None, "")  # (world_snapshot_bytes it was built from, LLM world context)
 }
 
+# Guards world between the simulation thread and request handlers
+world_lock = threading.RLock()
+
+# Set by requests that may give the simulation work again; the thread sleeps on it while quiet
+world_wake = threading.Event()
+
+# WebSocket clients subscribed to binary state frames on /ws -> their unsent frame slot
+# (a queue of size 1; mutated only on the event loop)
+state_subscribers = {}
+
 # Available tasks with their function definitions
 AVAILABLE_TASKS = {
     "tail": {
@@ -150,24 +440,39 @@ AVAILABLE_TASKS = {
     }
 }
 
-# OpenAI client (will be initialized with API key)
+# OpenAI client (will be initialized with API key), shared by all requests so its connection pool is reused
 openai_client = None
 
+# Echo the LLM world context in /nl/command responses (shown in the browser console); off by default
+NL_DEBUG = os.getenv("ORION_DEBUG", "0") == "1"
+
+# Recent LLM replies by prompt: the prompt embeds the world context, so a hit is the same
+# command on an unchanged world and can skip the API call
+NL_REPLY_CACHE_SIZE = 128
+nl_reply_cache: "OrderedDict[str, Any]" = OrderedDict()
+
+# NL command logging: handlers only enqueue records, a listener thread does the blocking stderr writes
+logger = logging.getLogger("nl_command")
+logger.propagate = False
+_log_queue = queue.SimpleQueue()
+logger.addHandler(logging.handlers.QueueHandler(_log_queue))
+log_listener = logging.handlers.QueueListener(_log_queue, logging.StreamHandler())
+
 # Simulation parameters
-DRONE_SPEED = 200.0  # pixels per second (increased for faster movement)
-ENEMY_SPEED = 40.0  # pixels per second for enemy drones
 WORLD_WIDTH = 1000
 WORLD_HEIGHT = 1000
 GRID_COLS = 10  # A-J (10 columns)
 GRID_ROWS = 10  # 1-10 (10 rows)
 CELL_SIZE = WORLD_WIDTH / GRID_COLS  # 100 pixels per cell
-SIMULATION_DT = 0.02  # 20ms update interval (50Hz for smooth physics)
+MAX_TICK_LAG = 5  # Ticks the loop may fall behind before it stops catching up
 DRONE_VISUAL_RADIUS = 13.0  # Visual radius of drones (increased for better visibility)
 DRONE_STROKE_WIDTH = 3.0  # Maximum stroke width (selected drones have strokeWidth=3, unselected=2)
 # In SVG, stroke is centered on the path, so outer edge is at radius + strokeWidth/2
 # But we'll use radius + strokeWidth to ensure we catch all collisions including the full stroke
 DRONE_HITBOX_RADIUS = DRONE_VISUAL_RADIUS + (DRONE_STROKE_WIDTH / 2.0)  # Total hitbox includes outer stroke edge
 DRONE_RADIUS = DRONE_HITBOX_RADIUS  # Use hitbox radius for collision detection
+COLLISION_DISTANCE_SQ = (DRONE_RADIUS * 2) ** 2  # Squared center distance at which circle edges touch
+GRID_CELL_SIZE = DRONE_RADIUS * 2  # Spatial hash cell size, the largest neighbour query radius (collisions)
 GRID_SPACING = DRONE_VISUAL_RADIUS * 2.0  # Spacing between drones in grid (minimal buffer)
 STUCK_THRESHOLD = 0.5  # Movement threshold to consider drone as having moved (pixels)
 STUCK_FRAMES_TO_ARRIVE = 5  # Number of frames without movement to consider "arrived"
@@ -209,18 +514,16 @@ def init_drones():
         drone_x = base["x"] + offset_x
         drone_y = base["y"] + offset_y
         
-        world["drones"][drone_id] = Drone(
-            id=drone_id,
+        world["drones"].add(
+            drone_id,
             x=drone_x,
             y=drone_y,
-            vx=0.0,
-            vy=0.0,
-            mode="idle",
-            team="friendly",
+            mode=MODE_IDLE,
+            team=TEAM_FRIENDLY,
             base_id=base_id,
             base_x=base["x"],
             base_y=base["y"],
-            base_shape=base["shape"]
+            base_shape=SHAPE_NAMES.index(base["shape"])
         )
     
     # Initialize enemy drones with different patterns
@@ -235,627 +538,398 @@ def init_drones():
     
     for i, pattern_info in enumerate(enemy_patterns):
         enemy_id = f"enemy_{i+1}"
-        pattern_data = {}
         
-        if pattern_info["pattern"] == "up_down":
-            pattern_data = {
-                "center_y": pattern_info["y"],
-                "range": pattern_info["range"],
-                "direction": 1  # 1 for down, -1 for up
-            }
-        elif pattern_info["pattern"] == "left_right":
-            pattern_data = {
-                "center_x": pattern_info["x"],
-                "range": pattern_info["range"],
-                "direction": 1  # 1 for right, -1 for left
-            }
-        elif pattern_info["pattern"] == "circular":
-            pattern_data = {
-                "center_x": pattern_info["x"],
-                "center_y": pattern_info["y"],
-                "radius": pattern_info["radius"],
-                "angle": 0.0  # Current angle in radians
-            }
+        # Circular enemies turn by a fixed angle every tick
+        radius = pattern_info.get("radius", 0.0)
+        angle_step = ENEMY_SPEED / radius * SIMULATION_DT if radius else 0.0
         
-        world["drones"][enemy_id] = Drone(
-            id=enemy_id,
+        world["drones"].add(
+            enemy_id,
             x=pattern_info["x"],
             y=pattern_info["y"],
-            vx=0.0,
-            vy=0.0,
-            mode="pattern",
-            team="enemy",
-            pattern=pattern_info["pattern"],
-            pattern_data=pattern_data
+            mode=MODE_PATTERN,
+            team=TEAM_ENEMY,
+            pattern=PATTERN_NAMES.index(pattern_info["pattern"]),
+            pattern_center_x=pattern_info["x"],
+            pattern_center_y=pattern_info["y"],
+            pattern_range=pattern_info.get("range", 0.0),
+            pattern_radius=radius,
+            pattern_cos=1.0,  # Current angle 0 (circular)
+            pattern_sin=0.0,
+            pattern_cos_step=math.cos(angle_step),
+            pattern_sin_step=math.sin(angle_step),
+            pattern_direction=1  # 1 for down/right, -1 for up/left
         )
 
-def predict_enemy_position(enemy_drone: Drone, t: float) -> tuple:
-    """Predict enemy drone position at time t based on its movement pattern."""
-    if enemy_drone.pattern_data is None:
-        return (enemy_drone.x, enemy_drone.y)
-    
-    if enemy_drone.pattern == "up_down":
-        center_y = enemy_drone.pattern_data["center_y"]
-        range_val = enemy_drone.pattern_data["range"]
-        direction = enemy_drone.pattern_data["direction"]
-        current_y = enemy_drone.y
-        
-        # Calculate distance traveled in time t
-        distance = direction * ENEMY_SPEED * t
-        new_y = current_y + distance
-        
-        # Handle bouncing at boundaries
-        while new_y > center_y + range_val or new_y < center_y - range_val:
-            if new_y > center_y + range_val:
-                # Hit top boundary, reverse
-                excess = new_y - (center_y + range_val)
-                new_y = center_y + range_val - excess
-                direction = -1
-            elif new_y < center_y - range_val:
-                # Hit bottom boundary, reverse
-                excess = (center_y - range_val) - new_y
-                new_y = center_y - range_val + excess
-                direction = 1
-        
-        return (enemy_drone.x, new_y)
-    
-    elif enemy_drone.pattern == "left_right":
-        center_x = enemy_drone.pattern_data["center_x"]
-        range_val = enemy_drone.pattern_data["range"]
-        direction = enemy_drone.pattern_data["direction"]
-        current_x = enemy_drone.x
-        
-        # Calculate distance traveled in time t
-        distance = direction * ENEMY_SPEED * t
-        new_x = current_x + distance
-        
-        # Handle bouncing at boundaries
-        while new_x > center_x + range_val or new_x < center_x - range_val:
-            if new_x > center_x + range_val:
-                # Hit right boundary, reverse
-                excess = new_x - (center_x + range_val)
-                new_x = center_x + range_val - excess
-                direction = -1
-            elif new_x < center_x - range_val:
-                # Hit left boundary, reverse
-                excess = (center_x - range_val) - new_x
-                new_x = center_x - range_val + excess
-                direction = 1
-        
-        return (new_x, enemy_drone.y)
+def _bounce(position: float, direction: int, center: float, range_val: float, t):
+    """Position after time t of an enemy bouncing between center - range and center + range.
     
-    elif enemy_drone.pattern == "circular":
-        center_x = enemy_drone.pattern_data["center_x"]
-        center_y = enemy_drone.pattern_data["center_y"]
-        radius = enemy_drone.pattern_data["radius"]
-        angle = enemy_drone.pattern_data["angle"]
+    Unfolds the bounces into a triangle wave, so it works on a whole array of times at once.
+    """
+    low = center - range_val
+    span = 2 * range_val
+    if span <= 0:
+        return np.full(np.shape(t), low)
+    # Distance from the low boundary if there were no walls, folded back into the range
+    unfolded = np.mod(position - low + direction * ENEMY_SPEED * t, 2 * span)
+    return low + np.where(unfolded <= span, unfolded, 2 * span - unfolded)
+
+def predict_enemy_position(arrays: DroneArrays, i: int, t) -> tuple:
+    """Predict enemy drone position at time t based on its movement pattern.
+    
+    t may be a scalar or an array of times; x and y come back with the same shape.
+    """
+    pattern = arrays.pattern[i]
+    x = float(arrays.x[i])
+    y = float(arrays.y[i])
+    
+    if pattern == PATTERN_UP_DOWN:
+        new_y = _bounce(y, int(arrays.pattern_direction[i]), float(arrays.pattern_center_y[i]),
+                        float(arrays.pattern_range[i]), t)
+        return (np.full(np.shape(t), x), new_y)
+    
+    elif pattern == PATTERN_LEFT_RIGHT:
+        new_x = _bounce(x, int(arrays.pattern_direction[i]), float(arrays.pattern_center_x[i]),
+                        float(arrays.pattern_range[i]), t)
+        return (new_x, np.full(np.shape(t), y))
+    
+    elif pattern == PATTERN_CIRCULAR:
+        center_x = float(arrays.pattern_center_x[i])
+        center_y = float(arrays.pattern_center_y[i])
+        radius = float(arrays.pattern_radius[i])
+        angle = pattern_angle(arrays, i)
         
         # Calculate new angle
         angular_speed = ENEMY_SPEED / radius
-        new_angle = angle + angular_speed * t
+        new_angle = angle + angular_speed * np.asarray(t)
         
         # Calculate position on circle
-        new_x = center_x + radius * math.cos(new_angle)
-        new_y = center_y + radius * math.sin(new_angle)
-        
-        return (new_x, new_y)
+        return (center_x + radius * np.cos(new_angle), center_y + radius * np.sin(new_angle))
     
     # Fallback to current position
-    return (enemy_drone.x, enemy_drone.y)
+    return (np.full(np.shape(t), x), np.full(np.shape(t), y))
+
+# Candidate intercept times: 0 to 30 seconds in 0.1s increments
+INTERCEPT_TIMES = np.arange(300) / 10.0
+# Distance a friendly covers by each candidate time (with small margin for approximation), squared
+_INTERCEPT_REACH_SQ = (DRONE_SPEED * (INTERCEPT_TIMES + 0.1)) ** 2
 
-def calculate_intercept_point(friendly_x: float, friendly_y: float, enemy_drone: Drone) -> tuple:
+def calculate_intercept_point(friendly_x: float, friendly_y: float, arrays: DroneArrays, enemy_index: int) -> tuple:
     """Calculate the best intercept point for a friendly drone to reach an enemy drone.
     Returns (intercept_x, intercept_y, intercept_time)"""
-    best_time = None
-    best_intercept = None
-    min_intercept_time = float('inf')
-    
-    # Search for intercept time between 0 and 30 seconds, in 0.1s steps
-    for t in range(0, 300):  # 0 to 30 seconds in 0.1s increments
-        t_sec = t / 10.0
-        enemy_x, enemy_y = predict_enemy_position(enemy_drone, t_sec)
-        
-        # Calculate distance to that point
-        dx = enemy_x - friendly_x
-        dy = enemy_y - friendly_y
-        distance = math.sqrt(dx * dx + dy * dy)
-        
-        # Calculate time needed for friendly drone to reach that point
-        time_needed = distance / DRONE_SPEED
-        
-        # Check if we can reach it in time (with small margin for approximation)
-        if time_needed <= t_sec + 0.1:  # Can reach it
-            if t_sec < min_intercept_time:
-                min_intercept_time = t_sec
-                best_time = t_sec
-                best_intercept = (enemy_x, enemy_y)
+    # Predict the enemy along every candidate time in one go
+    enemy_xs, enemy_ys = predict_enemy_position(arrays, enemy_index, INTERCEPT_TIMES)
+    dx = enemy_xs - friendly_x
+    dy = enemy_ys - friendly_y
+    
+    # Check where we can reach it in time: distance / DRONE_SPEED <= t + 0.1, compared squared
+    reachable = dx * dx + dy * dy <= _INTERCEPT_REACH_SQ
     
-    # If we found a good intercept, use it
-    if best_intercept:
-        return (best_intercept[0], best_intercept[1], best_time)
+    # If we found a good intercept, use the earliest one
+    if reachable.any():
+        k = int(reachable.argmax())
+        return (float(enemy_xs[k]), float(enemy_ys[k]), float(INTERCEPT_TIMES[k]))
     
     # Fallback: just head towards current enemy position
-    return (enemy_drone.x, enemy_drone.y, math.sqrt((enemy_drone.x - friendly_x)**2 + (enemy_drone.y - friendly_y)**2) / DRONE_SPEED)
+    enemy_x = float(arrays.x[enemy_index])
+    enemy_y = float(arrays.y[enemy_index])
+    return (enemy_x, enemy_y, math.sqrt((enemy_x - friendly_x)**2 + (enemy_y - friendly_y)**2) / DRONE_SPEED)
 
-def update_enemy_pattern(drone: Drone, dt: float) -> Drone:
-    """Update enemy drone position based on movement pattern."""
-    if drone.pattern_data is None:
-        return drone
-    
-    if drone.pattern == "up_down":
-        center_y = drone.pattern_data["center_y"]
-        range_val = drone.pattern_data["range"]
-        direction = drone.pattern_data["direction"]
-        
-        # Move up or down
-        drone.y += direction * ENEMY_SPEED * dt
-        
-        # Check bounds and reverse direction
-        if drone.y >= center_y + range_val:
-            drone.y = center_y + range_val
-            drone.pattern_data["direction"] = -1
-        elif drone.y <= center_y - range_val:
-            drone.y = center_y - range_val
-            drone.pattern_data["direction"] = 1
-        
-        drone.vy = direction * ENEMY_SPEED
-        drone.vx = 0.0
-        
-    elif drone.pattern == "left_right":
-        center_x = drone.pattern_data["center_x"]
-        range_val = drone.pattern_data["range"]
-        direction = drone.pattern_data["direction"]
-        
-        # Move left or right
-        drone.x += direction * ENEMY_SPEED * dt
-        
-        # Check bounds and reverse direction
-        if drone.x >= center_x + range_val:
-            drone.x = center_x + range_val
-            drone.pattern_data["direction"] = -1
-        elif drone.x <= center_x - range_val:
-            drone.x = center_x - range_val
-            drone.pattern_data["direction"] = 1
-        
-        drone.vx = direction * ENEMY_SPEED
-        drone.vy = 0.0
-        
-    elif drone.pattern == "circular":
-        center_x = drone.pattern_data["center_x"]
-        center_y = drone.pattern_data["center_y"]
-        radius = drone.pattern_data["radius"]
-        angle = drone.pattern_data["angle"]
-        
-        # Update angle
-        angular_speed = ENEMY_SPEED / radius
-        angle += angular_speed * dt
-        drone.pattern_data["angle"] = angle
-        
-        # Calculate position on circle
-        drone.x = center_x + radius * math.cos(angle)
-        drone.y = center_y + radius * math.sin(angle)
-        
-        # Calculate velocity (tangent to circle)
-        drone.vx = -ENEMY_SPEED * math.sin(angle)
-        drone.vy = ENEMY_SPEED * math.cos(angle)
+def calculate_grid_positions(num_drones: int, center_x: float, center_y: float) -> tuple:
+    """Calculate grid positions for drones in a square pattern centered around a point.
     
-    # Clamp to world bounds
-    drone.x = max(0, min(WORLD_WIDTH, drone.x))
-    drone.y = max(0, min(WORLD_HEIGHT, drone.y))
-    
-    return drone
-
-def calculate_grid_positions(num_drones: int, center_x: float, center_y: float) -> List[tuple]:
-    """Calculate grid positions for drones in a square pattern centered around a point."""
+    Returns (xs, ys) float32 arrays in row-major order.
+    """
     if num_drones == 0:
-        return []
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
     
     # Calculate grid dimensions (square as much as possible)
-    cols = int(math.ceil(math.sqrt(num_drones)))
-    rows = int(math.ceil(num_drones / cols))
-    
-    positions = []
+    cols = math.isqrt(num_drones - 1) + 1  # ceil(sqrt(num_drones))
+    rows = -(-num_drones // cols)
     spacing = GRID_SPACING
     
     # Calculate starting position (top-left of grid)
-    total_width = (cols - 1) * spacing
-    total_height = (rows - 1) * spacing
-    start_x = center_x - total_width / 2.0
-    start_y = center_y - total_height / 2.0
-    
-    # Generate positions in row-major order
-    for i in range(num_drones):
-        row = i // cols
-        col = i % cols
-        x = start_x + col * spacing
-        y = start_y + row * spacing
-        positions.append((x, y))
-    
-    return positions
-
-def all_group_drones_arrived(command_id: int, all_drones: List[Drone]) -> bool:
-    """Check if all drones in a command group have arrived at the destination."""
-    group_drones = [d for d in all_drones if d.command_id == command_id and d.mode == "moving"]
-    
-    if len(group_drones) == 0:
-        return True  # No moving drones in group
-    
-    # Check if all drones are close to their target
-    for drone in group_drones:
-        if drone.target_x is None or drone.target_y is None:
-            continue
-        dx = drone.target_x - drone.x
-        dy = drone.target_y - drone.y
-        distance = math.sqrt(dx * dx + dy * dy)
-        if distance > 5.0:  # Not close enough yet
-            return False
+    start_x = center_x - (cols - 1) * spacing / 2.0
+    start_y = center_y - (rows - 1) * spacing / 2.0
     
-    return True
+    row, col = np.divmod(np.arange(num_drones), cols)
+    xs = (start_x + col * spacing).astype(np.float32)
+    ys = (start_y + row * spacing).astype(np.float32)
+    return xs, ys
 
-def disperse_group(command_id: int, all_drones: List[Drone], target_x: float, target_y: float):
+def group_indices(arrays: DroneArrays, command_id: int) -> np.ndarray:
+    """Rows of drones that still belong to a command group.
+    
+    Membership sets are not pruned when drones are destroyed or retasked, so
+    each member is checked against its current row.
+    """
+    rows = []
+    for drone_id in world["command_groups"].get(command_id, ()):
+        i = arrays.id_to_index.get(drone_id)
+        if i is not None and arrays.command_id[i] == command_id:
+            rows.append(i)
+    # Row order keeps grid slot assignment stable
+    return np.sort(np.array(rows, dtype=np.intp))
+
+def disperse_group(arrays: DroneArrays, command_id: int, target_x: float, target_y: float):
     """Disperse a group of drones into a square grid around the target."""
-    group_drones = [d for d in all_drones if d.command_id == command_id and d.team == "friendly"]
+    group = group_indices(arrays, command_id)
+    # A group only disperses once; its drones finish individually from here
+    world["command_groups"].pop(command_id, None)
     
-    if len(group_drones) == 0:
+    if len(group) == 0:
         return
     
-    # Calculate grid positions
-    grid_positions = calculate_grid_positions(len(group_drones), target_x, target_y)
-    
     # Assign grid positions to drones
-    for i, drone in enumerate(group_drones):
-        if i < len(grid_positions):
-            drone.target_x = grid_positions[i][0]
-            drone.target_y = grid_positions[i][1]
-            drone.mode = "dispersing"
-
-def update_drone(drone: Drone, dt: float, all_drones: List[Drone]) -> Drone:
-    """Update drone position based on current velocity and target."""
-    # Handle enemy pattern movement
-    if drone.team == "enemy" and drone.mode == "pattern":
-        return update_enemy_pattern(drone, dt)
-    
-    # Handle friendly drone movement
-    if drone.team == "friendly":
-        # Handle tail mode: follow target drone while maintaining distance
-        if drone.mode == "tail" and drone.tail_target_id is not None:
-            # Find the target drone
-            target_drone = None
-            for d in all_drones:
-                if d.id == drone.tail_target_id:
-                    target_drone = d
-                    break
-            
-            if target_drone and target_drone.id != drone.id:
-                # Calculate distance to target
-                dx = target_drone.x - drone.x
-                dy = target_drone.y - drone.y
-                distance = math.sqrt(dx * dx + dy * dy)
-                
-                # Calculate desired position (maintain tail_distance from target)
-                if distance > 0:
-                    direction_x = dx / distance
-                    direction_y = dy / distance
-                else:
-                    direction_x = 0
-                    direction_y = 0
-                
-                # If too far, move closer. If too close, move away
-                distance_error = distance - drone.tail_distance
-                
-                if abs(distance_error) > 2.0:  # Only move if outside acceptable range (reduced for smoother movement)
-                    if distance_error > 0:
-                        # Too far - move towards target
-                        drone.vx = direction_x * DRONE_SPEED
-                        drone.vy = direction_y * DRONE_SPEED
-                    else:
-                        # Too close - move away from target
-                        drone.vx = -direction_x * DRONE_SPEED
-                        drone.vy = -direction_y * DRONE_SPEED
-                    
-                    # Update position
-                    drone.x += drone.vx * dt
-                    drone.y += drone.vy * dt
-                    
-                    # Clamp to world bounds
-                    drone.x = max(0, min(WORLD_WIDTH, drone.x))
-                    drone.y = max(0, min(WORLD_HEIGHT, drone.y))
-                else:
-                    # Within acceptable range - hold position
-                    drone.vx = 0.0
-                    drone.vy = 0.0
-            else:
-                # Target not found or invalid - go idle
-                drone.mode = "idle"
-                drone.tail_target_id = None
-                drone.vx = 0.0
-                drone.vy = 0.0
-        
-        # Handle intercept mode: intercept enemy drone, then return to start if another drone succeeded
-        elif drone.mode == "intercept" and drone.intercept_target_id is not None:
-            # Find the target enemy drone
-            enemy_target = None
-            for d in all_drones:
-                if d.id == drone.intercept_target_id:
-                    enemy_target = d
-                    break
-            
-            if not enemy_target:
-                # Enemy not found - return to start
-                if drone.intercept_start_x is not None and drone.intercept_start_y is not None:
-                    drone.target_x = drone.intercept_start_x
-                    drone.target_y = drone.intercept_start_y
-                    drone.mode = "moving"
-                    drone.intercept_target_id = None
-                else:
-                    drone.mode = "idle"
-                    drone.intercept_target_id = None
-            else:
-                # Check if any friendly drone has already intercepted this enemy
-                # Check distance to enemy for all drones intercepting the same target
-                dx_to_enemy = enemy_target.x - drone.x
-                dy_to_enemy = enemy_target.y - drone.y
-                distance_to_enemy = math.sqrt(dx_to_enemy * dx_to_enemy + dy_to_enemy * dy_to_enemy)
-                
-                # Check if this drone has intercepted
-                if distance_to_enemy < DRONE_RADIUS * 2:
-                    # This drone intercepted! Return to start
-                    if drone.intercept_start_x is not None and drone.intercept_start_y is not None:
-                        drone.target_x = drone.intercept_start_x
-                        drone.target_y = drone.intercept_start_y
-                        drone.mode = "moving"
-                        drone.intercept_target_id = None
-                        drone.intercept_start_x = None
-                        drone.intercept_start_y = None
-                else:
-                    # Check if any other drone has intercepted this enemy
-                    enemy_intercepted = False
-                    for d in all_drones:
-                        if (d.team == "friendly" and 
-                            d.intercept_target_id == drone.intercept_target_id and
-                            d.id != drone.id):
-                            # Check if this other drone has reached the enemy
-                            dx_other = enemy_target.x - d.x
-                            dy_other = enemy_target.y - d.y
-                            distance_other = math.sqrt(dx_other * dx_other + dy_other * dy_other)
-                            if distance_other < DRONE_RADIUS * 2:  # Collision distance
-                                enemy_intercepted = True
-                                break
-                    
-                    if enemy_intercepted:
-                        # Another drone intercepted - return to start
-                        if drone.intercept_start_x is not None and drone.intercept_start_y is not None:
-                            drone.target_x = drone.intercept_start_x
-                            drone.target_y = drone.intercept_start_y
-                            drone.mode = "moving"
-                            drone.intercept_target_id = None
-                            drone.intercept_start_x = None
-                            drone.intercept_start_y = None
-                    else:
-                        # Still intercepting - recalculate intercept point periodically
-                        intercept_x, intercept_y, _ = calculate_intercept_point(
-                            drone.x, drone.y, enemy_target
-                        )
-                        
-                        # Update target if significantly different (to avoid constant recalculations)
-                        if drone.target_x is None or drone.target_y is None:
-                            drone.target_x = intercept_x
-                            drone.target_y = intercept_y
-                        else:
-                            dx_target = abs(drone.target_x - intercept_x)
-                            dy_target = abs(drone.target_y - intercept_y)
-                            if dx_target > 10 or dy_target > 10:  # Update if target changed significantly
-                                drone.target_x = intercept_x
-                                drone.target_y = intercept_y
-                        
-                        # Move toward intercept point (same as moving mode)
-                        if drone.target_x is not None and drone.target_y is not None:
-                            dx = drone.target_x - drone.x
-                            dy = drone.target_y - drone.y
-                            distance = math.sqrt(dx * dx + dy * dy)
-                            
-                            if distance < 5.0:  # Close enough to intercept point
-                                # Reached intercept point, but enemy might have moved - recalculate
-                                intercept_x, intercept_y, _ = calculate_intercept_point(
-                                    drone.x, drone.y, enemy_target
-                                )
-                                drone.target_x = intercept_x
-                                drone.target_y = intercept_y
-                            else:
-                                # Move toward intercept point
-                                if distance > 0:
-                                    direction_x = dx / distance
-                                    direction_y = dy / distance
-                                else:
-                                    direction_x = 0
-                                    direction_y = 0
-                                
-                                drone.vx = direction_x * DRONE_SPEED
-                                drone.vy = direction_y * DRONE_SPEED
-                                
-                                # Update position
-                                drone.x += drone.vx * dt
-                                drone.y += drone.vy * dt
-                                
-                                # Clamp to world bounds
-                                drone.x = max(0, min(WORLD_WIDTH, drone.x))
-                                drone.y = max(0, min(WORLD_HEIGHT, drone.y))
-        
-        # Handle patrol mode: go back and forth between start and target positions
-        elif drone.mode == "patrol" and drone.patrol_start_x is not None and drone.patrol_target_x is not None:
-            # Determine current target (start or patrol target)
-            if drone.patrol_to_target:
-                target_x = drone.patrol_target_x
-                target_y = drone.patrol_target_y
-            else:
-                target_x = drone.patrol_start_x
-                target_y = drone.patrol_start_y
-            
-            # Calculate distance to current target
-            dx = target_x - drone.x
-            dy = target_y - drone.y
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            # Check if arrived at current patrol point
-            if distance < 5.0:
-                # Arrived - switch direction
-                drone.patrol_to_target = not drone.patrol_to_target
-                drone.x = target_x
-                drone.y = target_y
-                drone.vx = 0.0
-                drone.vy = 0.0
-            else:
-                # Move towards current patrol point
-                if distance > 0:
-                    direction_x = dx / distance
-                    direction_y = dy / distance
-                else:
-                    direction_x = 0
-                    direction_y = 0
-                
-                drone.vx = direction_x * DRONE_SPEED
-                drone.vy = direction_y * DRONE_SPEED
-                
-                # Update position
-                drone.x += drone.vx * dt
-                drone.y += drone.vy * dt
-                
-                # Clamp to world bounds
-                drone.x = max(0, min(WORLD_WIDTH, drone.x))
-                drone.y = max(0, min(WORLD_HEIGHT, drone.y))
-        
-        elif drone.mode == "moving" and drone.target_x is not None and drone.target_y is not None:
-            # Simple movement toward target (can overlap)
-            dx = drone.target_x - drone.x
-            dy = drone.target_y - drone.y
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            if distance < 5.0:  # Close enough to target
-                # Arrived at target - snap to it
-                drone.x = drone.target_x
-                drone.y = drone.target_y
-                drone.vx = 0.0
-                drone.vy = 0.0
-                
-                # Check if all drones in group have arrived
-                if drone.command_id is not None:
-                    if all_group_drones_arrived(drone.command_id, all_drones):
-                        # All arrived - trigger dispersion
-                        disperse_group(drone.command_id, all_drones, drone.target_x, drone.target_y)
-                        # This drone will be set to dispersing mode by disperse_group
-                        return drone
-                
-                # Not all arrived yet, stay in moving mode
-            else:
-                # Move toward target
-                if distance > 0:
-                    direction_x = dx / distance
-                    direction_y = dy / distance
-                else:
-                    direction_x = 0
-                    direction_y = 0
-                
-                drone.vx = direction_x * DRONE_SPEED
-                drone.vy = direction_y * DRONE_SPEED
-                
-                # Update position
-                drone.x += drone.vx * dt
-                drone.y += drone.vy * dt
-                
-                # Clamp to world bounds
-                drone.x = max(0, min(WORLD_WIDTH, drone.x))
-                drone.y = max(0, min(WORLD_HEIGHT, drone.y))
-        
-        elif drone.mode == "dispersing" and drone.target_x is not None and drone.target_y is not None:
-            # Moving to grid position
-            dx = drone.target_x - drone.x
-            dy = drone.target_y - drone.y
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            if distance < 2.0:  # Arrived at grid position
-                drone.x = drone.target_x
-                drone.y = drone.target_y
-                drone.vx = 0.0
-                drone.vy = 0.0
-                drone.mode = "idle"
-                drone.target_x = None
-                drone.target_y = None
-                drone.command_id = None
-            else:
-                # Move toward grid position with deceleration to prevent overshooting
-                if distance > 0:
-                    direction_x = dx / distance
-                    direction_y = dy / distance
-                else:
-                    direction_x = 0
-                    direction_y = 0
-                
-                # Decelerate as we approach target to prevent overshooting
-                # At high speeds, we need to slow down when close to target
-                deceleration_distance = max(10.0, DRONE_SPEED * dt * 2)  # Slow down when within 2 frames of travel
-                if distance < deceleration_distance:
-                    # Scale speed based on distance (smooth deceleration)
-                    speed_factor = distance / deceleration_distance
-                    current_speed = DRONE_SPEED * speed_factor
-                else:
-                    current_speed = DRONE_SPEED
-                
-                drone.vx = direction_x * current_speed
-                drone.vy = direction_y * current_speed
-                
-                # Update position
-                drone.x += drone.vx * dt
-                drone.y += drone.vy * dt
-                
-                # Clamp to world bounds
-                drone.x = max(0, min(WORLD_WIDTH, drone.x))
-                drone.y = max(0, min(WORLD_HEIGHT, drone.y))
-        
-        else:
-            # Idle - no movement
-            drone.vx = 0.0
-            drone.vy = 0.0
+    arrays.target_x[group], arrays.target_y[group] = calculate_grid_positions(len(group), target_x, target_y)
+    arrays.mode[group] = MODE_DISPERSING
+
+def _step_tail(arrays: DroneArrays, i: int, dt: float):
+    """Follow the tail target while maintaining tail_distance from it."""
+    target_index = arrays.id_to_index.get(arrays.tail_target_id[i])
+    
+    if target_index is None or target_index == i:
+        # Target not found or invalid - go idle
+        arrays.mode[i] = MODE_IDLE
+        arrays.tail_target_id[i] = None
+        arrays.vx[i] = 0.0
+        arrays.vy[i] = 0.0
+        return
+    
+    # Calculate distance to target
+    x, y = float(arrays.x[i]), float(arrays.y[i])
+    dx = float(arrays.x[target_index]) - x
+    dy = float(arrays.y[target_index]) - y
+    d2 = dx * dx + dy * dy
+    
+    # Acceptable band around tail_distance (reduced for smoother movement), compared squared
+    tail_distance = float(arrays.tail_distance[i])
+    near = max(tail_distance - 2.0, 0.0)
+    far = tail_distance + 2.0
+    
+    if near * near <= d2 <= far * far:
+        # Within acceptable range - hold position
+        arrays.vx[i] = 0.0
+        arrays.vy[i] = 0.0
+        return
+    
+    # If too far, move closer. If too close, move away (maintain tail_distance from target)
+    inv = 1.0 / math.sqrt(d2) if d2 > 0 else 0.0
+    speed = DRONE_SPEED if d2 > far * far else -DRONE_SPEED
+    vx = dx * inv * speed
+    vy = dy * inv * speed
+    arrays.vx[i] = vx
+    arrays.vy[i] = vy
+    arrays.x[i] = x + vx * dt
+    arrays.y[i] = y + vy * dt
+
+def _return_from_intercept(arrays: DroneArrays, i: int):
+    """Send an intercepting drone back to where it started (or idle if unknown)."""
+    start_x, start_y = arrays.intercept_start_x[i], arrays.intercept_start_y[i]
+    arrays.intercept_target_id[i] = None
+    if np.isnan(start_x) or np.isnan(start_y):
+        arrays.mode[i] = MODE_IDLE
+        arrays.vx[i] = 0.0
+        arrays.vy[i] = 0.0
+        return
+    arrays.target_x[i] = start_x
+    arrays.target_y[i] = start_y
+    arrays.mode[i] = MODE_MOVING
+    arrays.intercept_start_x[i] = np.nan
+    arrays.intercept_start_y[i] = np.nan
+
+def _step_intercept(arrays: DroneArrays, i: int, dt: float):
+    """Chase the predicted intercept point, then return to start once anyone hits the enemy."""
+    enemy_index = arrays.id_to_index.get(arrays.intercept_target_id[i])
+    if enemy_index is None:
+        # Enemy not found - return to start
+        _return_from_intercept(arrays, i)
+        return
+    
+    x, y = float(arrays.x[i]), float(arrays.y[i])
+    enemy_x, enemy_y = float(arrays.x[enemy_index]), float(arrays.y[enemy_index])
     
-    return drone
+    # Check if this drone or any other drone chasing the same enemy has reached it
+    n = arrays.len
+    chasers = (arrays.team[:n] == TEAM_FRIENDLY) & (arrays.intercept_target_id[:n] == arrays.intercept_target_id[i])
+    dx = enemy_x - arrays.x[:n][chasers]
+    dy = enemy_y - arrays.y[:n][chasers]
+    if np.any(dx * dx + dy * dy < COLLISION_DISTANCE_SQ):
+        _return_from_intercept(arrays, i)
+        return
+    
+    # Still intercepting - recalculate intercept point
+    intercept_x, intercept_y, _ = calculate_intercept_point(x, y, arrays, enemy_index)
+    target_x, target_y = float(arrays.target_x[i]), float(arrays.target_y[i])
+    
+    # Update target if significantly different (to avoid constant recalculations)
+    if math.isnan(target_x) or math.isnan(target_y) or abs(target_x - intercept_x) > 10 or abs(target_y - intercept_y) > 10:
+        target_x, target_y = intercept_x, intercept_y
+    
+    # Move toward intercept point (same as moving mode)
+    dx = target_x - x
+    dy = target_y - y
+    d2 = dx * dx + dy * dy
+    
+    if d2 < ARRIVAL_DISTANCE_SQ:  # Close enough to intercept point
+        # Reached intercept point, but enemy might have moved - recalculate
+        target_x, target_y, _ = calculate_intercept_point(x, y, arrays, enemy_index)
+    else:
+        inv = 1.0 / math.sqrt(d2)
+        vx = dx * inv * DRONE_SPEED
+        vy = dy * inv * DRONE_SPEED
+        arrays.vx[i] = vx
+        arrays.vy[i] = vy
+        arrays.x[i] = x + vx * dt
+        arrays.y[i] = y + vy * dt
+    
+    arrays.target_x[i] = target_x
+    arrays.target_y[i] = target_y
+
+def _step_patrol(arrays: DroneArrays, i: int, dt: float):
+    """Go back and forth between the patrol start and target positions."""
+    # Determine current target (start or patrol target)
+    if arrays.patrol_to_target[i]:
+        target_x, target_y = float(arrays.patrol_target_x[i]), float(arrays.patrol_target_y[i])
+    else:
+        target_x, target_y = float(arrays.patrol_start_x[i]), float(arrays.patrol_start_y[i])
+    
+    if math.isnan(target_x) or math.isnan(target_y):
+        arrays.vx[i] = 0.0
+        arrays.vy[i] = 0.0
+        return
+    
+    # Calculate distance to current target
+    x, y = float(arrays.x[i]), float(arrays.y[i])
+    dx = target_x - x
+    dy = target_y - y
+    d2 = dx * dx + dy * dy
+    
+    # Check if arrived at current patrol point
+    if d2 < ARRIVAL_DISTANCE_SQ:
+        # Arrived - switch direction
+        arrays.patrol_to_target[i] = not arrays.patrol_to_target[i]
+        arrays.x[i] = target_x
+        arrays.y[i] = target_y
+        arrays.vx[i] = 0.0
+        arrays.vy[i] = 0.0
+    else:
+        # Move towards current patrol point
+        inv = 1.0 / math.sqrt(d2)
+        vx = dx * inv * DRONE_SPEED
+        vy = dy * inv * DRONE_SPEED
+        arrays.vx[i] = vx
+        arrays.vy[i] = vy
+        arrays.x[i] = x + vx * dt
+        arrays.y[i] = y + vy * dt
+
+# Per-tick handlers for the modes the kernel leaves to Python
+TASK_MODE_STEPS = {
+    MODE_TAIL: _step_tail,
+    MODE_INTERCEPT: _step_intercept,
+    MODE_PATROL: _step_patrol
+}
+
+def step_drones(arrays: DroneArrays):
+    """Advance every drone by one fixed SIMULATION_DT tick."""
+    dt = SIMULATION_DT
+    n = arrays.len
+    arrived = np.empty(n, dtype=np.int64)
+    tasked = np.empty(n, dtype=np.int64)
+    num_arrived, num_tasked = step_kernel(
+        arrays.x[:n], arrays.y[:n], arrays.vx[:n], arrays.vy[:n],
+        arrays.target_x[:n], arrays.target_y[:n],
+        arrays.mode[:n], arrays.command_id[:n],
+        arrays.pattern[:n], arrays.pattern_direction[:n],
+        arrays.pattern_center_x[:n], arrays.pattern_center_y[:n],
+        arrays.pattern_range[:n], arrays.pattern_radius[:n],
+        arrays.pattern_cos[:n], arrays.pattern_sin[:n],
+        arrays.pattern_cos_step[:n], arrays.pattern_sin_step[:n],
+        arrived, tasked
+    )
+    
+    # Task modes need per-drone lookups of other drones, so they stay in Python
+    mode = arrays.mode
+    for i in tasked[:num_tasked].tolist():
+        TASK_MODE_STEPS[mode[i]](arrays, i, dt)
+    
+    # Clamp to world bounds in one branchless pass over every drone
+    np.clip(arrays.x[:n], 0.0, WORLD_WIDTH, out=arrays.x[:n])
+    np.clip(arrays.y[:n], 0.0, WORLD_HEIGHT, out=arrays.y[:n])
+    
+    # Once every drone of a command group has arrived, spread the group into a grid.
+    # One pass over the moving drones finds the groups that still have a drone en route.
+    if num_arrived:
+        rows = arrived[:num_arrived]
+        command_ids, first = np.unique(arrays.command_id[rows], return_index=True)
+        moving = np.flatnonzero(arrays.mode[:n] == MODE_MOVING)
+        dx = arrays.target_x[moving] - arrays.x[moving]
+        dy = arrays.target_y[moving] - arrays.y[moving]
+        en_route = arrays.command_id[moving[dx * dx + dy * dy > ARRIVAL_DISTANCE_SQ]]
+        complete = ~np.isin(command_ids, en_route)
+        for command_id, i in zip(command_ids[complete].tolist(), rows[first[complete]].tolist()):
+            if command_id >= 0 and command_id in world["command_groups"]:
+                disperse_group(arrays, command_id, float(arrays.target_x[i]), float(arrays.target_y[i]))
+    
+    # Positions are final for this tick; neighbour queries (collisions, ...) share this grid
+    update_grid(arrays)
+
+@dataclass
+class SpatialGrid:
+    """Uniform grid over the world in CSR layout: the rows in cell k are items[starts[k]:starts[k + 1]].
+    
+    Cells are numbered column-major (k = cell_x * dim + cell_y), so a column of
+    neighbouring cells is one contiguous slice of items.
+    """
+    cell: float
+    dim: int  # Cells per side
+    starts: np.ndarray
+    items: np.ndarray
+
+def build_grid(xs: np.ndarray, ys: np.ndarray, cell: float) -> SpatialGrid:
+    """Bucket row indices of the given positions into uniform grid cells."""
+    # Positions are clamped to the world, so a fixed dim x dim table covers every cell
+    dim = int(max(WORLD_WIDTH, WORLD_HEIGHT) // cell) + 1
+    cx = np.clip((xs // cell).astype(np.int64), 0, dim - 1)
+    cy = np.clip((ys // cell).astype(np.int64), 0, dim - 1)
+    keys = cx * dim + cy
+    
+    starts = np.zeros(dim * dim + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys, minlength=dim * dim), out=starts[1:])
+    # Stable sort keeps rows in drone order within each cell
+    return SpatialGrid(cell, dim, starts, np.argsort(keys, kind="stable"))
+
+def update_grid(arrays: DroneArrays):
+    """Rebuild world["grid"], the spatial hash of every drone row, from current positions."""
+    n = arrays.len
+    world["grid"] = build_grid(arrays.x[:n], arrays.y[:n], GRID_CELL_SIZE)
 
 def check_collisions():
     """Check for collisions between friendly and enemy drones and remove them."""
-    drones_to_remove = set()
-    
-    friendly_drones = [d for d in world["drones"].values() if d.team == "friendly"]
-    enemy_drones = [d for d in world["drones"].values() if d.team == "enemy"]
-    
-    for friendly in friendly_drones:
-        if friendly.id in drones_to_remove:
-            continue
-        for enemy in enemy_drones:
-            if enemy.id in drones_to_remove:
-                continue
-            
-            dx = friendly.x - enemy.x
-            dy = friendly.y - enemy.y
-            distance = math.sqrt(dx * dx + dy * dy)
-            
-            # Collision when circle edges touch: distance between centers < sum of radii
-            if distance < DRONE_RADIUS * 2:
-                # Collision detected - remove both
-                drones_to_remove.add(friendly.id)
-                drones_to_remove.add(enemy.id)
-                break
+    arrays = world["drones"]
+    n = arrays.len
+    grid = world["grid"]
+    
+    # The kernel picks the friendlies out by team itself; every pair uses up one enemy too
+    pairs = np.empty((n // 2, 2), dtype=np.int64)
+    num_pairs = find_collisions(
+        arrays.x[:n], arrays.y[:n], arrays.team[:n],
+        grid.starts, grid.items, grid.dim, grid.cell, COLLISION_DISTANCE_SQ, pairs,
+    )
     
     # Remove collided drones
-    for drone_id in drones_to_remove:
-        if drone_id in world["drones"]:
-            del world["drones"][drone_id]
+    if num_pairs:
+        arrays.remove(pairs[:num_pairs].ravel().tolist())
+        update_grid(arrays)  # Rows were compacted
     
-    return len(drones_to_remove) > 0
+    return num_pairs > 0
 
 def save_history_snapshot():
     """Save current world state to history."""
-    # Create a deep copy of current state
+    # Copy the current state (two buffer copies for the drones)
     snapshot = {
-        "drones": {drone_id: drone.model_copy(deep=True) for drone_id, drone in world["drones"].items()},
-        "timestamp": world["last_update"]
+        "drones": world["drones"].snapshot(),
+        "command_groups": dict(world["command_groups"])  # Member sets are never mutated, only replaced
     }
     
     # Add snapshot to history
@@ -863,7 +937,7 @@ def save_history_snapshot():
     
     # Limit history size (keep only recent history)
     if len(world["history"]) > HISTORY_MAX_LENGTH:
-        world["history"].pop(0)
+        world["history"].popleft()
     
     # Always point to the end when recording new history
     world["history_index"] = len(world["history"]) - 1
@@ -872,69 +946,142 @@ def restore_from_history(index: int):
     """Restore world state from history at given index."""
     if 0 <= index < len(world["history"]):
         snapshot = world["history"][index]
-        world["drones"] = {drone_id: drone.model_copy(deep=True) for drone_id, drone in snapshot["drones"].items()}
-        world["last_update"] = snapshot["timestamp"]
+        world["drones"] = DroneArrays.from_snapshot(snapshot["drones"])
+        world["command_groups"] = dict(snapshot["command_groups"])
         world["history_index"] = index
+        world["snapshot_dirty"] = True
         return True
     return False
 
-async def simulation_loop():
-    """Background task that updates drone positions."""
+def broadcast_state(frame: bytes):
+    """Hand one binary state frame to every /ws subscriber (runs on the event loop).
+    
+    A subscriber that has not sent its previous frame yet gets it replaced, so a
+    client that stops reading costs one pending frame instead of a backlog.
+    """
+    for slot in state_subscribers.values():
+        if slot.full():
+            slot.get_nowait()
+        slot.put_nowait(frame)
+
+def simulation_quiet() -> bool:
+    """True when ticking would change nothing: paused, rewound to the start, or every drone idle."""
+    if world["paused"]:
+        return True
+    if world["time_direction"] == -1:
+        return world["history_index"] <= 0
+    arrays = world["drones"]
+    return not np.any(arrays.mode[:arrays.len] != MODE_IDLE)
+
+def run_simulation(loop: asyncio.AbstractEventLoop):
+    """Simulation thread: update drone positions at a fixed SIMULATION_DT step.
+    
+    Runs off the event loop so request handling and physics overlap; the Numba kernel
+    releases the GIL. Each tick holds world_lock, as do handlers that touch the world.
+    """
     frame_count = 0
+    next_tick = time.monotonic()
     while True:
-        current_time = datetime.now().timestamp()
-        dt = min(SIMULATION_DT, current_time - world["last_update"])
-        world["last_update"] = current_time
+        with world_lock:
+            # Cleared under the lock so a wake-up from any later request is never lost
+            world_wake.clear()
+            if world["paused"]:
+                pass
+            elif world["time_direction"] == -1:
+                # Go backwards in history
+                if world["history_index"] > 0:
+                    restore_from_history(world["history_index"] - 1)
+            else:
+                # Normal forward simulation
+                step_drones(world["drones"])
+                world["snapshot_dirty"] = True
+                
+                # Check for collisions
+                check_collisions()
+                
+                # Save history snapshot
+                frame_count += 1
+                if frame_count % HISTORY_SAVE_INTERVAL == 0:
+                    save_history_snapshot()
+            
+            frame = encode_state_frame(world["drones"]) if state_subscribers else None
+            quiet = simulation_quiet()
         
-        # Handle pause
-        if world["paused"]:
-            await asyncio.sleep(SIMULATION_DT)
-            continue
+        if frame is not None:
+            loop.call_soon_threadsafe(broadcast_state, frame)
         
-        # Handle time reversal
-        if world["time_direction"] == -1:
-            # Go backwards in history
-            if world["history_index"] > 0:
-                restore_from_history(world["history_index"] - 1)
-            await asyncio.sleep(SIMULATION_DT)
+        if quiet:
+            # Nothing will change until a request does something - sleep until one wakes us
+            world_wake.wait()
+            next_tick = time.monotonic()
             continue
         
-        # Normal forward simulation
-        # Get all drones as a list for collision/separation calculations
-        all_drones = list(world["drones"].values())
-        
-        # Update all drones
-        for drone_id, drone in list(world["drones"].items()):
-            world["drones"][drone_id] = update_drone(drone, dt, all_drones)
-        
-        # Check for collisions
-        check_collisions()
-        
-        # Save history snapshot
-        frame_count += 1
-        if frame_count % HISTORY_SAVE_INTERVAL == 0:
-            save_history_snapshot()
-        
-        await asyncio.sleep(SIMULATION_DT)
+        # Schedule against absolute deadlines so sleep rounding does not accumulate;
+        # a late tick runs the next one immediately to catch up
+        next_tick += SIMULATION_DT
+        now = time.monotonic()
+        if now - next_tick > MAX_TICK_LAG * SIMULATION_DT:
+            # Too far behind (e.g. a long GC pause) - drop the backlog instead of spiralling
+            next_tick = now
+        time.sleep(max(0.0, next_tick - now))
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize drones and start simulation loop."""
     init_drones()
-    asyncio.create_task(simulation_loop())
+    log_listener.start()
+    threading.Thread(
+        target=run_simulation, args=(asyncio.get_running_loop(),), name="simulation", daemon=True
+    ).start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Close the pooled connections of the shared OpenAI client and flush queued log records."""
+    if openai_client is not None:
+        await openai_client.close()
+    log_listener.stop()
 
 @app.get("/")
 async def root():
     """Health check endpoint."""
     return {"status": "ok", "message": "Drone Swarm API"}
 
-@app.get("/world", response_model=WorldState)
+def world_snapshot() -> bytes:
+    """Encoded world state, re-encoded at most once per state change and shared by all readers."""
+    with world_lock:
+        if world["snapshot_dirty"]:
+            world["world_snapshot_bytes"] = encode_world(world["drones"])
+            world["snapshot_dirty"] = False
+        return world["world_snapshot_bytes"]
+
+@app.get("/world", responses={200: {"model": WorldState}})
 async def get_world():
     """Get current world state with all drones."""
-    return WorldState(
-        drones=list(world["drones"].values()),
-        timestamp=world["last_update"]
-    )
+    return Response(content=world_snapshot(), media_type="application/json")
+
+@app.websocket("/ws")
+async def state_stream(websocket: WebSocket):
+    """Subscribe to binary state frames (see encode_state_frame), pushed by the simulation loop every tick."""
+    await websocket.accept()
+    slot = asyncio.Queue(maxsize=1)
+    
+    async def send_frames():
+        try:
+            while True:
+                await websocket.send_bytes(await slot.get())
+        except Exception:
+            # Connection went away mid-send; the receive loop below sees the disconnect
+            pass
+    
+    state_subscribers[websocket] = slot
+    sender = asyncio.create_task(send_frames())
+    try:
+        # Subscribers only listen; anything they send is ignored
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        state_subscribers.pop(websocket, None)
+        sender.cancel()
 
 # Task functions that actually control drones
 def tail_task(enemy_drone: str, friendly_drones: List[str] = None, distance: float = 50.0):
@@ -945,8 +1092,10 @@ def tail_task(enemy_drone: str, friendly_drones: List[str] = None, distance: flo
     # Hardcode distance to 50
     distance = 50.0
     
+    arrays = world["drones"]
+    
     # Verify enemy drone exists
-    if enemy_drone not in world["drones"]:
+    if enemy_drone not in arrays.id_to_index:
         result = {
             "task_name": "tail",
             "parameters": {
@@ -961,16 +1110,15 @@ def tail_task(enemy_drone: str, friendly_drones: List[str] = None, distance: flo
     
     updated_count = 0
     for drone_id in friendly_drones:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            if drone.team == "friendly" and drone_id != enemy_drone:
-                drone.mode = "tail"
-                drone.tail_target_id = enemy_drone
-                drone.tail_distance = distance  # Always 50
-                drone.vx = 0.0
-                drone.vy = 0.0
-                drone.command_id = None  # Tail doesn't use command groups
-                world["drones"][drone_id] = drone
+        i = arrays.id_to_index.get(drone_id)
+        if i is not None:
+            if arrays.team[i] == TEAM_FRIENDLY and drone_id != enemy_drone:
+                arrays.mode[i] = MODE_TAIL
+                arrays.tail_target_id[i] = enemy_drone
+                arrays.tail_distance[i] = distance  # Always 50
+                arrays.vx[i] = 0.0
+                arrays.vy[i] = 0.0
+                arrays.command_id[i] = -1  # Tail doesn't use command groups
                 updated_count += 1
     
     result = {
@@ -1008,21 +1156,21 @@ def patrol_task(locations: List[Dict[str, float]] = None, friendly_drones: List[
     start_loc = locations[0]
     target_loc = locations[1]
     
+    arrays = world["drones"]
     for drone_id in friendly_drones:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            if drone.team == "friendly":
-                drone.mode = "patrol"
-                drone.patrol_start_x = start_loc.get("x", drone.x)
-                drone.patrol_start_y = start_loc.get("y", drone.y)
-                drone.patrol_target_x = target_loc.get("x", drone.x)
-                drone.patrol_target_y = target_loc.get("y", drone.y)
+        i = arrays.id_to_index.get(drone_id)
+        if i is not None:
+            if arrays.team[i] == TEAM_FRIENDLY:
+                arrays.mode[i] = MODE_PATROL
+                arrays.patrol_start_x[i] = start_loc.get("x", arrays.x[i])
+                arrays.patrol_start_y[i] = start_loc.get("y", arrays.y[i])
+                arrays.patrol_target_x[i] = target_loc.get("x", arrays.x[i])
+                arrays.patrol_target_y[i] = target_loc.get("y", arrays.y[i])
                 # Start by going to the first location (start), then to the second (target)
-                drone.patrol_to_target = False  # False = go to start first, True = go to target
-                drone.vx = 0.0
-                drone.vy = 0.0
-                drone.command_id = None  # Patrol doesn't use command groups
-                world["drones"][drone_id] = drone
+                arrays.patrol_to_target[i] = False  # False = go to start first, True = go to target
+                arrays.vx[i] = 0.0
+                arrays.vy[i] = 0.0
+                arrays.command_id[i] = -1  # Patrol doesn't use command groups
                 updated_count += 1
     
     result = {
@@ -1043,17 +1191,17 @@ def hold_task(friendly_drones: List[str] = None):
         friendly_drones = []
     
     updated_count = 0
+    arrays = world["drones"]
     for drone_id in friendly_drones:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            if drone.team == "friendly":
-                drone.mode = "idle"
-                drone.vx = 0.0
-                drone.vy = 0.0
-                drone.target_x = None
-                drone.target_y = None
-                drone.command_id = None
-                world["drones"][drone_id] = drone
+        i = arrays.id_to_index.get(drone_id)
+        if i is not None:
+            if arrays.team[i] == TEAM_FRIENDLY:
+                arrays.mode[i] = MODE_IDLE
+                arrays.vx[i] = 0.0
+                arrays.vy[i] = 0.0
+                arrays.target_x[i] = np.nan
+                arrays.target_y[i] = np.nan
+                arrays.command_id[i] = -1
                 updated_count += 1
     
     result = {
@@ -1073,17 +1221,17 @@ def return_to_base_task(friendly_drones: List[str] = None):
         friendly_drones = []
     
     updated_count = 0
+    arrays = world["drones"]
     for drone_id in friendly_drones:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            if drone.team == "friendly":
-                drone.mode = "moving"
-                drone.target_x = drone.base_x
-                drone.target_y = drone.base_y
-                drone.vx = 0.0
-                drone.vy = 0.0
-                drone.command_id = None  # Return to base doesn't use command groups
-                world["drones"][drone_id] = drone
+        i = arrays.id_to_index.get(drone_id)
+        if i is not None:
+            if arrays.team[i] == TEAM_FRIENDLY:
+                arrays.mode[i] = MODE_MOVING
+                arrays.target_x[i] = arrays.base_x[i]
+                arrays.target_y[i] = arrays.base_y[i]
+                arrays.vx[i] = 0.0
+                arrays.vy[i] = 0.0
+                arrays.command_id[i] = -1  # Return to base doesn't use command groups
                 updated_count += 1
     
     result = {
@@ -1102,8 +1250,10 @@ def intercept_task(enemy_drone: str, friendly_drones: List[str] = None):
     if friendly_drones is None:
         friendly_drones = []
     
+    arrays = world["drones"]
+    
     # Verify enemy drone exists
-    if enemy_drone not in world["drones"]:
+    if enemy_drone not in arrays.id_to_index:
         result = {
             "task_name": "intercept",
             "parameters": {
@@ -1116,8 +1266,8 @@ def intercept_task(enemy_drone: str, friendly_drones: List[str] = None):
         world["task_results"].append(result)
         return result
     
-    enemy = world["drones"][enemy_drone]
-    if enemy.team != "enemy":
+    enemy_index = arrays.id_to_index[enemy_drone]
+    if arrays.team[enemy_index] != TEAM_ENEMY:
         result = {
             "task_name": "intercept",
             "parameters": {
@@ -1132,25 +1282,24 @@ def intercept_task(enemy_drone: str, friendly_drones: List[str] = None):
     
     updated_count = 0
     for drone_id in friendly_drones:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            if drone.team == "friendly" and drone_id != enemy_drone:
+        i = arrays.id_to_index.get(drone_id)
+        if i is not None:
+            if arrays.team[i] == TEAM_FRIENDLY and drone_id != enemy_drone:
                 # Calculate intercept point
                 intercept_x, intercept_y, intercept_time = calculate_intercept_point(
-                    drone.x, drone.y, enemy
+                    float(arrays.x[i]), float(arrays.y[i]), arrays, enemy_index
                 )
                 
                 # Store starting position for return
-                drone.intercept_start_x = drone.x
-                drone.intercept_start_y = drone.y
-                drone.intercept_target_id = enemy_drone
-                drone.mode = "intercept"
-                drone.target_x = intercept_x
-                drone.target_y = intercept_y
-                drone.vx = 0.0
-                drone.vy = 0.0
-                drone.command_id = None  # Intercept doesn't use command groups
-                world["drones"][drone_id] = drone
+                arrays.intercept_start_x[i] = arrays.x[i]
+                arrays.intercept_start_y[i] = arrays.y[i]
+                arrays.intercept_target_id[i] = enemy_drone
+                arrays.mode[i] = MODE_INTERCEPT
+                arrays.target_x[i] = intercept_x
+                arrays.target_y[i] = intercept_y
+                arrays.vx[i] = 0.0
+                arrays.vy[i] = 0.0
+                arrays.command_id[i] = -1  # Intercept doesn't use command groups
                 updated_count += 1
     
     result = {
@@ -1166,6 +1315,13 @@ def intercept_task(enemy_drone: str, friendly_drones: List[str] = None):
     return result
 
 # Task function registry
+def run_task(task_func, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    """Run a task function against the live world (shared by the UI and NL endpoints)."""
+    with world_lock:
+        world["snapshot_dirty"] = True
+        world_wake.set()
+        return task_func(**parameters)
+
 TASK_FUNCTIONS = {
     "tail": tail_task,
     "patrol": patrol_task,
@@ -1187,35 +1343,38 @@ async def get_bases():
 @app.post("/set-base")
 async def set_base(request: SetBaseRequest):
     """Set the home base for selected drones."""
-    if request.base_id not in BASES:
-        return {"success": False, "message": f"Base {request.base_id} not found"}
-    
-    base = BASES[request.base_id]
-    updated_count = 0
-    
-    for drone_id in request.drone_ids:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            if drone.team == "friendly":
-                drone.base_id = request.base_id
-                drone.base_x = base["x"]
-                drone.base_y = base["y"]
-                drone.base_shape = base["shape"]
-                world["drones"][drone_id] = drone
-                updated_count += 1
-    
-    return {"success": True, "updated_drones": updated_count}
+    with world_lock:
+        if request.base_id not in BASES:
+            return {"success": False, "message": f"Base {request.base_id} not found"}
+        
+        base = BASES[request.base_id]
+        updated_count = 0
+        
+        arrays = world["drones"]
+        for drone_id in request.drone_ids:
+            i = arrays.id_to_index.get(drone_id)
+            if i is not None:
+                if arrays.team[i] == TEAM_FRIENDLY:
+                    arrays.base_id[i] = request.base_id
+                    arrays.base_x[i] = base["x"]
+                    arrays.base_y[i] = base["y"]
+                    arrays.base_shape[i] = SHAPE_NAMES.index(base["shape"])
+                    updated_count += 1
+        
+        world["snapshot_dirty"] = True
+        return {"success": True, "updated_drones": updated_count}
 
 @app.post("/pause")
 async def pause_simulation(command: PauseCommand):
     """Pause or unpause the simulation."""
-    world["paused"] = command.paused
-    return {"status": "ok", "paused": world["paused"]}
-
-@app.post("/time-control")
-async def time_control(command: TimeControlCommand):
-    """Control time: reverse, forward, or jump back."""
-    if command.action == "reverse":
+    with world_lock:
+        world["paused"] = command.paused
+        world_wake.set()
+        return {"status": "ok", "paused": world["paused"]}
+
+def apply_time_control(action: str) -> dict:
+    """Apply a time-control action to the world; the caller holds world_lock."""
+    if action == "reverse":
         # Toggle reverse mode
         if world["time_direction"] == 1:
             world["time_direction"] = -1
@@ -1224,13 +1383,13 @@ async def time_control(command: TimeControlCommand):
             world["time_direction"] = 1
         return {"status": "ok", "time_direction": world["time_direction"]}
     
-    elif command.action == "forward":
+    elif action == "forward":
         # Set to forward mode
         world["time_direction"] = 1
         world["paused"] = False
         return {"status": "ok", "time_direction": world["time_direction"]}
     
-    elif command.action == "jump_back":
+    elif action == "jump_back":
         # Jump back 5 seconds (250 frames at 50Hz)
         frames_to_jump = 250
         
@@ -1252,34 +1411,47 @@ async def time_control(command: TimeControlCommand):
     
     return {"status": "error", "message": "Invalid action"}
 
+@app.post("/time-control")
+async def time_control(command: TimeControlCommand):
+    """Control time: reverse, forward, or jump back."""
+    with world_lock:
+        result = apply_time_control(command.action)
+        # Set after the change and under the lock, so the simulation thread cannot
+        # clear it and still see the old, quiet state
+        world_wake.set()
+        return result
+
 @app.post("/reset")
 async def reset_simulation():
     """Reset the simulation by reinitializing drones and clearing history."""
-    # Clear current drones and history
-    world["drones"] = {}
-    world["history"] = []
-    world["history_index"] = -1
-    world["next_command_id"] = 1
-    world["paused"] = False
-    world["time_direction"] = 1
-    world["task_results"] = []
-    
-    # Reinitialize drones
-    init_drones()
-    
-    return {"status": "ok", "message": "Simulation reset"}
+    with world_lock:
+        # Clear current drones and history
+        world["drones"] = DroneArrays()
+        world["history"].clear()
+        world["history_index"] = -1
+        world["next_command_id"] = 1
+        world["command_groups"] = {}
+        world["paused"] = False
+        world["time_direction"] = 1
+        world["task_results"] = []
+        
+        # Reinitialize drones
+        init_drones()
+        world["snapshot_dirty"] = True
+        world_wake.set()
+        
+        return {"status": "ok", "message": "Simulation reset"}
 
 @app.post("/task/execute")
 async def execute_task(task_execution: TaskExecution):
     """Execute a task via UI."""
-    if task_execution.task_name not in TASK_FUNCTIONS:
+    task_func = TASK_FUNCTIONS.get(task_execution.task_name)
+    if task_func is None:
         return {"success": False, "message": f"Unknown task: {task_execution.task_name}"}
     
-    task_func = TASK_FUNCTIONS[task_execution.task_name]
-    
     # Call the task function with parameters
     try:
-        result = task_func(**task_execution.parameters)
+        result = run_task(task_func, task_execution.parameters)
         return {
             "success": True,
             "message": f"Task {task_execution.task_name} executed",
@@ -1298,36 +1470,42 @@ async def get_task_results():
 @app.post("/command")
 async def send_command(command: Command):
     """Send a command to move selected drones to a target location."""
-    # Assign the same command_id to all drones in this command
-    command_id = world["next_command_id"]
-    world["next_command_id"] += 1
-    
-    updated_count = 0
-    for drone_id in command.drone_ids:
-        if drone_id in world["drones"]:
-            drone = world["drones"][drone_id]
-            # Only allow moving friendly drones
-            if drone.team == "friendly":
-                drone.target_x = command.target_x
-                drone.target_y = command.target_y
-                drone.mode = "moving"
-                drone.command_id = command_id  # Assign group ID
-                drone.stuck_frames = 0  # Reset stuck counter for new command
-                world["drones"][drone_id] = drone
-                updated_count += 1
-    
-    return {
-        "status": "ok",
-        "updated_drones": updated_count,
-        "target": {"x": command.target_x, "y": command.target_y}
-    }
+    with world_lock:
+        # Assign the same command_id to all drones in this command
+        command_id = world["next_command_id"]
+        world["next_command_id"] += 1
+        
+        updated_count = 0
+        arrays = world["drones"]
+        for drone_id in command.drone_ids:
+            i = arrays.id_to_index.get(drone_id)
+            if i is not None:
+                # Only allow moving friendly drones
+                if arrays.team[i] == TEAM_FRIENDLY:
+                    arrays.target_x[i] = command.target_x
+                    arrays.target_y[i] = command.target_y
+                    arrays.mode[i] = MODE_MOVING
+                    arrays.command_id[i] = command_id  # Assign group ID
+                    arrays.stuck_frames[i] = 0  # Reset stuck counter for new command
+                    updated_count += 1
+        
+        if updated_count:
+            world["command_groups"][command_id] = set(command.drone_ids)
+            world["snapshot_dirty"] = True
+            world_wake.set()
+        
+        return {
+            "status": "ok",
+            "updated_drones": updated_count,
+            "target": {"x": command.target_x, "y": command.target_y}
+        }
 
 def chess_notation_to_coords(notation: str) -> tuple:
     """Convert chess notation (e.g., 'B4', 'A1', 'T20') to (x, y) coordinates.
     
     Args:
         notation: Chess-style notation like 'B4' (letter + number)
-        
+    
     Returns:
         Tuple of (x, y) coordinates in world space, or None if invalid
     """
@@ -1358,61 +1536,67 @@ def chess_notation_to_coords(notation: str) -> tuple:
     return (x, y)
 
 def get_world_context() -> str:
-    """Get current world state as context for LLM, including distance calculations."""
-    friendly_drones = [d for d in world["drones"].values() if d.team == "friendly"]
-    enemy_drones = [d for d in world["drones"].values() if d.team == "enemy"]
+    """Get current world state as context for LLM, including distance calculations.
+    
+    Reused until the world changes, keyed on the identity of the cached /world snapshot.
+    """
+    snapshot = world_snapshot()
+    cached_snapshot, cached_context = world["context_cache"]
+    if cached_snapshot is snapshot:
+        return cached_context
+    
+    arrays = world["drones"]
+    n = arrays.len
+    friendly = np.flatnonzero(arrays.team[:n] == TEAM_FRIENDLY)
+    enemy = np.flatnonzero(arrays.team[:n] == TEAM_ENEMY)
+    xs, ys = arrays.x[:n].astype(np.float64), arrays.y[:n].astype(np.float64)
+    friendly_ids = [arrays.ids[i] for i in friendly.tolist()]
+    enemy_ids = [arrays.ids[i] for i in enemy.tolist()]
+    
+    # Distance matrix (friendly rows x enemy columns), rounded as reported to the LLM
+    dx = xs[enemy][None, :] - xs[friendly][:, None]
+    dy = ys[enemy][None, :] - ys[friendly][:, None]
+    distances = [[round(d, 1) for d in row] for row in np.sqrt(dx * dx + dy * dy).tolist()]
     
     # Calculate distances from each friendly drone to each enemy drone
     # This helps the LLM identify "closest" drones accurately
-    friendly_with_distances = []
-    for friendly in friendly_drones:
-        distances_to_enemies = {}
-        for enemy in enemy_drones:
-            dx = enemy.x - friendly.x
-            dy = enemy.y - friendly.y
-            distance = math.sqrt(dx * dx + dy * dy)
-            distances_to_enemies[enemy.id] = round(distance, 1)
-        friendly_with_distances.append({
-            "id": friendly.id,
-            "x": round(friendly.x, 1),
-            "y": round(friendly.y, 1),
-            "distances_to_enemies": distances_to_enemies
-        })
-    
-    # Pre-calculate closest drones for each enemy in sorted order (closest first)
+    friendly_with_distances = [
+        {
+            "id": drone_id,
+            "x": round(x, 1),
+            "y": round(y, 1),
+            "distances_to_enemies": dict(zip(enemy_ids, row))
+        }
+        for drone_id, x, y, row in zip(friendly_ids, xs[friendly].tolist(), ys[friendly].tolist(), distances)
+    ]
+    
+    # Pre-calculate closest drones for each enemy in sorted order (closest first);
+    # a stable sort on the rounded distances keeps ties in drone order
     closest_drones_by_enemy = {}
-    for enemy in enemy_drones:
-        # Find distances from all friendly drones to this enemy
-        distances = []
-        for friendly in friendly_drones:
-            dx = enemy.x - friendly.x
-            dy = enemy.y - friendly.y
-            distance = math.sqrt(dx * dx + dy * dy)
-            distances.append((friendly.id, round(distance, 1)))
-        
-        # Sort by distance (closest first)
-        distances.sort(key=lambda x: x[1])
-        
-        # Extract just the drone IDs in sorted order (closest first)
-        sorted_drone_ids = [drone_id for drone_id, _ in distances]
-        
-        # Store both the single closest and the full sorted list
-        if distances:
-            closest_drones_by_enemy[enemy.id] = {
-                "closest_drone": distances[0][0],  # Single closest (for backward compatibility)
-                "distance": distances[0][1],
-                "closest_drones_sorted": sorted_drone_ids,  # All drones sorted by distance (closest first)
-                "distances_sorted": distances  # Full list with distances for reference
+    if len(friendly):
+        order = np.argsort(np.array(distances), axis=0, kind="stable").T.tolist()
+        for e, enemy_id in enumerate(enemy_ids):
+            ranked = [(friendly_ids[f], distances[f][e]) for f in order[e]]
+            
+            # Store both the single closest and the full sorted list
+            closest_drones_by_enemy[enemy_id] = {
+                "closest_drone": ranked[0][0],  # Single closest (for backward compatibility)
+                "distance": ranked[0][1],
+                "closest_drones_sorted": [drone_id for drone_id, _ in ranked],  # All drones sorted by distance (closest first)
+                "distances_sorted": ranked  # Full list with distances for reference
             }
     
     context = {
         "friendly_drones": friendly_with_distances,
         "enemy_drones": [
-            {"id": d.id, "x": round(d.x, 1), "y": round(d.y, 1)} for d in enemy_drones
+            {"id": drone_id, "x": round(x, 1), "y": round(y, 1)}
+            for drone_id, x, y in zip(enemy_ids, xs[enemy].tolist(), ys[enemy].tolist())
         ],
         "closest_drones": closest_drones_by_enemy  # Pre-calculated: enemy_id -> closest friendly drone
     }
-    return json.dumps(context, indent=2)
+    text = orjson.dumps(context, option=orjson.OPT_INDENT_2).decode()
+    world["context_cache"] = (snapshot, text)
+    return text
 
 def create_function_definitions() -> List[Dict]:
     """Create OpenAI function definitions for available tasks."""
@@ -1529,6 +1713,10 @@ def create_function_definitions() -> List[Dict]:
         }
     ]
 
+# The task set is fixed, so the tool schema (and its serialised form for the reply cache key) is built once
+TOOL_DEFINITIONS = create_function_definitions()
+TOOL_DEFINITIONS_JSON = orjson.dumps(TOOL_DEFINITIONS).decode()
+
 @app.post("/nl/command")
 async def process_natural_language(command: NaturalLanguageCommand):
     """Process natural language command using OpenAI."""
@@ -1543,7 +1731,7 @@ async def process_natural_language(command: NaturalLanguageCommand):
                 "message": "OpenAI API key not set. Please create a .env file with OPENAI_API_KEY=your_key"
             }
         try:
-            openai_client = OpenAI(api_key=api_key)
+            openai_client = AsyncOpenAI(api_key=api_key)
         except Exception as e:
             return {
                 "success": False,
@@ -1551,7 +1739,8 @@ async def process_natural_language(command: NaturalLanguageCommand):
             }
     
     # Get current world context
-    world_context = get_world_context()
+    with world_lock:
+        world_context = get_world_context()
     
     # Create system prompt
     system_prompt = f"""You are a drone command assistant. You help users control drones using natural language.
@@ -1691,33 +1880,40 @@ When converting chess notation to coordinates, remember: A-J (10 letters), 1-10
 
 FINAL REMINDER: YOU MUST CALL EXACTLY ONE FUNCTION EXACTLY ONCE. NEVER TWO FUNCTIONS. NEVER THE SAME FUNCTION TWICE. DO NOT RESPOND WITH TEXT. DO NOT EXPLAIN. JUST MAKE ONE SINGLE FUNCTION CALL IMMEDIATELY.
 """
-    
+
     try:
-        # Call OpenAI API in a thread pool to avoid blocking the event loop
-        # This prevents the simulation from freezing during the API call
-        loop = asyncio.get_event_loop()
-        response = await loop.run_in_executor(
-            None,
-            lambda: openai_client.chat.completions.create(
-                model="gpt-4o-mini",
+        model = "gpt-4o-mini"
+        cache_key = hashlib.sha256("\x1f".join(
+            (model, system_prompt, command.command, TOOL_DEFINITIONS_JSON)
+        ).encode()).hexdigest()
+        
+        message = nl_reply_cache.get(cache_key)
+        if message is not None:
+            nl_reply_cache.move_to_end(cache_key)
+        else:
+            # Await the async client so the event loop keeps serving other requests during the call
+            response = await openai_client.chat.completions.create(
+                model=model,
                 messages=[
                     {"role": "system", "content": system_prompt},
                     {"role": "user", "content": command.command}
                 ],
-                tools=create_function_definitions(),
+                tools=TOOL_DEFINITIONS,
                 tool_choice="auto",
                 temperature=0.1  # Lower temperature for more deterministic, accurate responses
             )
-        )
-        
-        message = response.choices[0].message
+            
+            message = response.choices[0].message
+            nl_reply_cache[cache_key] = message
+            if len(nl_reply_cache) > NL_REPLY_CACHE_SIZE:
+                nl_reply_cache.popitem(last=False)
         
         # Check if function was called
         if message.tool_calls:
             # CRITICAL: Only process the FIRST tool call if multiple are returned
             # This ensures we only execute one function per command
             if len(message.tool_calls) > 1:
-                print(f"Warning: LLM returned {len(message.tool_calls)} tool calls, but only processing the first one")
+                logger.warning("LLM returned %d tool calls, but only processing the first one", len(message.tool_calls))
             
             # Process only the first tool call
             tool_call = message.tool_calls[0]
@@ -1725,18 +1921,18 @@ FINAL REMINDER: YOU MUST CALL EXACTLY ONE FUNCTION EXACTLY ONCE. NEVER TWO FUNCT
             results = []
             
             try:
-                function_args = json.loads(tool_call.function.arguments)
-            except json.JSONDecodeError as e:
+                function_args = orjson.loads(tool_call.function.arguments)
+            except orjson.JSONDecodeError as e:
                 return {
                     "success": False,
                     "message": f"Failed to parse function arguments: {str(e)}"
                 }
             
             # Execute the function
-            if function_name in TASK_FUNCTIONS:
+            task_func = TASK_FUNCTIONS.get(function_name)
+            if task_func is not None:
                 try:
-                    task_func = TASK_FUNCTIONS[function_name]
-                    result = task_func(**function_args)
+                    result = run_task(task_func, function_args)
                     results.append({
                         "success": True,
                         "task_name": result["task_name"],
@@ -1754,25 +1950,22 @@ FINAL REMINDER: YOU MUST CALL EXACTLY ONE FUNCTION EXACTLY ONCE. NEVER TWO FUNCT
                 }
             
             # Format tool call for display (only the first one)
-            tool_calls_display = []
-            try:
-                function_args = json.loads(tool_call.function.arguments)
-                tool_calls_display.append({
-                    "function": tool_call.function.name,
-                    "arguments": function_args
-                })
-            except:
-                pass
+            tool_calls_display = [{
+                "function": function_name,
+                "arguments": function_args
+            }]
             
-            return {
+            payload = {
                 "success": True,
                 "message": f"Processed command: {command.command}",
                 "results": results,
-                "tool_calls": tool_calls_display,  # Include tool calls for chatbot display
-                "debug": {
-                    "world_context": json.loads(world_context)  # Include world context in response for debugging
-                }
+                "tool_calls": tool_calls_display  # Include tool calls for chatbot display
             }
+            if NL_DEBUG:
+                payload["debug"] = {
+                    "world_context": orjson.loads(world_context)  # Include world context in response for debugging
+                }
+            return payload
         else:
             # No function was called - LLM might have responded with text
             if message.content:
@@ -1786,9 +1979,7 @@ FINAL REMINDER: YOU MUST CALL EXACTLY ONE FUNCTION EXACTLY ONCE. NEVER TWO FUNCT
             }
     
     except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"Error processing NL command: {error_details}")  # Log to console for debugging
+        logger.exception("Error processing NL command")  # Log to console for debugging
         return {
             "success": False,
             "message": f"Error processing command: {str(e)}"
@@ -1796,5 +1987,7 @@ FINAL REMINDER: YOU MUST CALL EXACTLY ONE FUNCTION EXACTLY ONCE. NEVER TWO FUNCT
 
 if __name__ == "__main__":
     import uvicorn
+    # One process only: the world and the simulation thread live in it, so extra workers would each
+    # run their own diverging world. uvloop/httptools are picked automatically when installed.
     uvicorn.run(app, host="0.0.0.0", port=8000)
 
@@ -0,0 +1,195 @@
+"""
+Numba kernels for the per-tick drone physics.
+
+They work on the raw columns of the simulation arrays (see DroneArrays in main.py),
+so the constants they read are defined here and imported by main.py.
+"""
+import math
+import numpy as np
+from numba import njit
+
+# Integer codes used by the simulation arrays (the API still speaks strings).
+# /ws frames carry raw mode/team codes; the frontend decodes them with these tables, which
+# /world sends as frame_codes - so reordering them needs no frontend change.
+MODE_NAMES = ("idle", "moving", "dispersing", "pattern", "patrol", "tail", "intercept")
+MODE_IDLE, MODE_MOVING, MODE_DISPERSING, MODE_PATTERN, MODE_PATROL, MODE_TAIL, MODE_INTERCEPT = range(len(MODE_NAMES))
+TEAM_NAMES = ("friendly", "enemy")
+TEAM_FRIENDLY, TEAM_ENEMY = range(len(TEAM_NAMES))
+PATTERN_NAMES = (None, "up_down", "left_right", "circular")
+PATTERN_NONE, PATTERN_UP_DOWN, PATTERN_LEFT_RIGHT, PATTERN_CIRCULAR = range(len(PATTERN_NAMES))
+SHAPE_NAMES = ("circle", "square", "triangle")
+SHAPE_CIRCLE, SHAPE_SQUARE, SHAPE_TRIANGLE = range(len(SHAPE_NAMES))
+
+SIMULATION_DT = 0.02  # 20ms update interval (50Hz for smooth physics)
+DRONE_SPEED = 200.0  # pixels per second (increased for faster movement)
+ENEMY_SPEED = 40.0  # pixels per second for enemy drones
+ARRIVAL_DISTANCE_SQ = 5.0 ** 2  # Squared distance at which a drone has reached its target
+SLOT_ARRIVAL_DISTANCE_SQ = 2.0 ** 2  # Tighter squared distance for settling into a grid slot
+DECELERATION_DISTANCE = max(10.0, DRONE_SPEED * SIMULATION_DT * 2)  # Slow down when within 2 frames of travel
+
+# fastmath without the no-NaN/no-Inf flags: NaN marks "no target" in the drone arrays
+_FASTMATH = {"nsz", "arcp", "contract", "afn", "reassoc"}
+
+@njit(
+    "UniTuple(i8, 2)(f4[::1], f4[::1], f4[::1], f4[::1], f4[::1], f4[::1], i1[::1], i4[::1],"
+    " i1[::1], i1[::1], f4[::1], f4[::1], f4[::1], f4[::1],"
+    " f4[::1], f4[::1], f4[::1], f4[::1], i8[::1], i8[::1])",
+    cache=True, nogil=True, fastmath=_FASTMATH
+)
+def step_kernel(x, y, vx, vy, tx, ty, mode, command_id,
+                pattern, patdir, patcx, patcy, patrange, patradius,
+                patcos, patsin, patcos_step, patsin_step, arrived, tasked):
+    """Physics kernel: advance pattern enemies and moving/dispersing friendlies in place.
+    
+    Dispatches once on mode, relying on its invariants: only enemies are in pattern
+    mode, and moving/dispersing drones always have a target.
+    One pass over the drones also sorts out the follow-up work: rows of moving drones
+    that reached their target this tick go to arrived, rows in a task mode (tail,
+    intercept, patrol) go to tasked untouched. Returns (num_arrived, num_tasked).
+    The step is always SIMULATION_DT, which Numba folds in as a compile-time constant;
+    positions are clamped to the world by the caller.
+    """
+    dt = SIMULATION_DT
+    num_arrived = 0
+    num_tasked = 0
+    for i in range(x.shape[0]):
+        m = mode[i]
+        
+        if m == MODE_IDLE:
+            # Velocity is zeroed on every switch to idle, so there is nothing to write
+            continue
+        
+        elif m == MODE_MOVING:
+            dx = tx[i] - x[i]
+            dy = ty[i] - y[i]
+            d2 = dx * dx + dy * dy
+            if d2 < ARRIVAL_DISTANCE_SQ:
+                # Arrived at target - snap to it
+                x[i] = tx[i]
+                y[i] = ty[i]
+                vx[i] = 0.0
+                vy[i] = 0.0
+                arrived[num_arrived] = i
+                num_arrived += 1
+                continue
+            inv = 1.0 / math.sqrt(d2)
+            vx[i] = dx * inv * DRONE_SPEED
+            vy[i] = dy * inv * DRONE_SPEED
+            x[i] += vx[i] * dt
+            y[i] += vy[i] * dt
+        
+        elif m == MODE_DISPERSING:
+            dx = tx[i] - x[i]
+            dy = ty[i] - y[i]
+            d2 = dx * dx + dy * dy
+            if d2 < SLOT_ARRIVAL_DISTANCE_SQ:
+                # Arrived at grid position - done with this command
+                x[i] = tx[i]
+                y[i] = ty[i]
+                vx[i] = 0.0
+                vy[i] = 0.0
+                mode[i] = MODE_IDLE
+                tx[i] = np.nan
+                ty[i] = np.nan
+                command_id[i] = -1
+                continue
+            # Decelerate as we approach the grid slot to prevent overshooting
+            inv = 1.0 / math.sqrt(d2)
+            if d2 < DECELERATION_DISTANCE * DECELERATION_DISTANCE:
+                speed = DRONE_SPEED * d2 * inv / DECELERATION_DISTANCE
+            else:
+                speed = DRONE_SPEED
+            vx[i] = dx * inv * speed
+            vy[i] = dy * inv * speed
+            x[i] += vx[i] * dt
+            y[i] += vy[i] * dt
+        
+        elif m == MODE_PATTERN:
+            p = pattern[i]
+            if p == PATTERN_UP_DOWN:
+                direction = patdir[i]
+                y[i] += direction * ENEMY_SPEED * dt
+                vx[i] = 0.0
+                vy[i] = direction * ENEMY_SPEED
+                # Check bounds and reverse direction
+                if y[i] >= patcy[i] + patrange[i]:
+                    y[i] = patcy[i] + patrange[i]
+                    patdir[i] = -1
+                elif y[i] <= patcy[i] - patrange[i]:
+                    y[i] = patcy[i] - patrange[i]
+                    patdir[i] = 1
+            elif p == PATTERN_LEFT_RIGHT:
+                direction = patdir[i]
+                x[i] += direction * ENEMY_SPEED * dt
+                vx[i] = direction * ENEMY_SPEED
+                vy[i] = 0.0
+                if x[i] >= patcx[i] + patrange[i]:
+                    x[i] = patcx[i] + patrange[i]
+                    patdir[i] = -1
+                elif x[i] <= patcx[i] - patrange[i]:
+                    x[i] = patcx[i] - patrange[i]
+                    patdir[i] = 1
+            elif p == PATTERN_CIRCULAR:
+                # Rotate (cos, sin) by the fixed per-tick step instead of calling cos/sin
+                c = patcos[i] * patcos_step[i] - patsin[i] * patsin_step[i]
+                s = patsin[i] * patcos_step[i] + patcos[i] * patsin_step[i]
+                # One Newton step back to unit length keeps rounding from drifting the radius
+                k = 1.5 - 0.5 * (c * c + s * s)
+                cos_a = c * k
+                sin_a = s * k
+                patcos[i] = cos_a
+                patsin[i] = sin_a
+                x[i] = patcx[i] + patradius[i] * cos_a
+                y[i] = patcy[i] + patradius[i] * sin_a
+                # Velocity is tangent to the circle
+                vx[i] = -ENEMY_SPEED * sin_a
+                vy[i] = ENEMY_SPEED * cos_a
+        
+        else:
+            # Tail, intercept and patrol look up other drones - handled in Python
+            tasked[num_tasked] = i
+            num_tasked += 1
+    
+    return num_arrived, num_tasked
+
+@njit(
+    "i8(f4[::1], f4[::1], i1[::1], i8[::1], i8[::1], i8, f8, f8, i8[:, ::1])",
+    cache=True, nogil=True, fastmath=_FASTMATH
+)
+def find_collisions(x, y, team, starts, items, dim, cell, distance_sq, pairs):
+    """Collision kernel: pair friendlies with enemies closer than sqrt(distance_sq).
+    
+    Each friendly (in row order) takes the lowest-indexed enemy it touches that is
+    still in play, probing only the 3x3 block of cells around it in the CSR grid
+    given by starts/items (see SpatialGrid in main.py).
+    Pairs are written to pairs as (friendly row, enemy row); returns how many.
+    """
+    available = team == TEAM_ENEMY
+    num_pairs = 0
+    for f in range(x.shape[0]):
+        if team[f] != TEAM_FRIENDLY:
+            continue
+        fx = x[f]
+        fy = y[f]
+        cx = min(max(int(fx // cell), 0), dim - 1)
+        cy = min(max(int(fy // cell), 0), dim - 1)
+        y_lo = max(cy - 1, 0)
+        y_hi = min(cy + 1, dim - 1)
+        hit = -1
+        for gx in range(max(cx - 1, 0), min(cx + 1, dim - 1) + 1):
+            # Cells are column-major, so the three cells of this column are one slice
+            for k in range(starts[gx * dim + y_lo], starts[gx * dim + y_hi + 1]):
+                e = items[k]
+                if not available[e] or (hit >= 0 and e > hit):
+                    continue
+                # Collision when circle edges touch: distance between centers < sum of radii
+                dx = x[e] - fx
+                dy = y[e] - fy
+                if dx * dx + dy * dy < distance_sq:
+                    hit = e
+        if hit >= 0:
+            available[hit] = False
+            pairs[num_pairs, 0] = f
+            pairs[num_pairs, 1] = hit
+            num_pairs += 1
+    return num_pairs
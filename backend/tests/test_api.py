@@ -0,0 +1,45 @@
+"""HTTP checks against the FastAPI app.
+
+The client is not entered as a context manager, so the startup hook (and with it
+the simulation thread) never runs; each test sets up the world it needs.
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+
+client = TestClient(main.app)
+
+@pytest.fixture(autouse=True)
+def fresh_world():
+    main.world["drones"] = main.DroneArrays()
+    main.world["command_groups"] = {}
+    main.init_drones()
+
+@pytest.mark.parametrize("value", ["NaN", "Infinity", "-Infinity"])
+def test_command_rejects_non_finite_target(value):
+    # Standard JSON has no NaN/Infinity, so the body is sent as raw text
+    response = client.post(
+        "/command",
+        content='{"drone_ids": ["drone_1"], "target_x": %s, "target_y": 100}' % value,
+        headers={"content-type": "application/json"},
+    )
+    
+    assert response.status_code == 422
+    error = response.json()["detail"][0]
+    assert error["loc"] == ["body", "target_x"]
+    assert error["input"] is None  # The rejected value is echoed back as null
+    
+    arrays = main.world["drones"]
+    assert arrays.mode[arrays.id_to_index["drone_1"]] == main.MODE_IDLE
+
+def test_command_accepts_finite_target():
+    response = client.post("/command", json={"drone_ids": ["drone_1"], "target_x": 300, "target_y": 100})
+    
+    assert response.status_code == 200
+    assert response.json()["updated_drones"] == 1
+
+def test_world_sends_frame_code_tables():
+    codes = client.get("/world").json()["frame_codes"]
+    
+    assert codes == {"mode": list(main.MODE_NAMES), "team": list(main.TEAM_NAMES)}
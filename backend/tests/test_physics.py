@@ -0,0 +1,181 @@
+"""Compare the array/Numba simulation with the original per-drone Python loops.
+
+The reference functions below port the pre-SoA implementations loop for loop,
+taking plain values instead of Drone models.
+"""
+import asyncio
+import math
+
+import numpy as np
+import pytest
+
+import main
+
+# Reference implementations
+
+def reference_collisions(drones: list) -> set:
+    """Nested-loop collision check of the original check_collisions: ids it would remove."""
+    drones_to_remove = set()
+    
+    friendly_drones = [d for d in drones if d["team"] == "friendly"]
+    enemy_drones = [d for d in drones if d["team"] == "enemy"]
+    
+    for friendly in friendly_drones:
+        if friendly["id"] in drones_to_remove:
+            continue
+        for enemy in enemy_drones:
+            if enemy["id"] in drones_to_remove:
+                continue
+            
+            dx = friendly["x"] - enemy["x"]
+            dy = friendly["y"] - enemy["y"]
+            distance = math.sqrt(dx * dx + dy * dy)
+            
+            # Collision when circle edges touch: distance between centers < sum of radii
+            if distance < main.DRONE_RADIUS * 2:
+                drones_to_remove.add(friendly["id"])
+                drones_to_remove.add(enemy["id"])
+                break
+    
+    return drones_to_remove
+
+def reference_predict(enemy: dict, t: float) -> tuple:
+    """Original predict_enemy_position: one time step, bounces unrolled in a loop."""
+    if enemy["pattern_data"] is None:
+        return (enemy["x"], enemy["y"])
+    
+    if enemy["pattern"] in ("up_down", "left_right"):
+        axis = "y" if enemy["pattern"] == "up_down" else "x"
+        center = enemy["pattern_data"]["center_" + axis]
+        range_val = enemy["pattern_data"]["range"]
+        direction = enemy["pattern_data"]["direction"]
+        new = enemy[axis] + direction * main.ENEMY_SPEED * t
+        
+        while new > center + range_val or new < center - range_val:
+            if new > center + range_val:
+                new = center + range_val - (new - (center + range_val))
+            elif new < center - range_val:
+                new = center - range_val + ((center - range_val) - new)
+        
+        return (enemy["x"], new) if axis == "y" else (new, enemy["y"])
+    
+    elif enemy["pattern"] == "circular":
+        data = enemy["pattern_data"]
+        new_angle = data["angle"] + main.ENEMY_SPEED / data["radius"] * t
+        return (data["center_x"] + data["radius"] * math.cos(new_angle),
+                data["center_y"] + data["radius"] * math.sin(new_angle))
+    
+    return (enemy["x"], enemy["y"])
+
+def reference_intercept(friendly_x: float, friendly_y: float, enemy: dict) -> tuple:
+    """Original calculate_intercept_point: scan 0-30 s in 0.1 s steps for the first reachable point."""
+    for t in range(0, 300):
+        t_sec = t / 10.0
+        enemy_x, enemy_y = reference_predict(enemy, t_sec)
+        distance = math.sqrt((enemy_x - friendly_x) ** 2 + (enemy_y - friendly_y) ** 2)
+        if distance / main.DRONE_SPEED <= t_sec + 0.1:
+            return (enemy_x, enemy_y, t_sec)
+    
+    return (enemy["x"], enemy["y"],
+            math.sqrt((enemy["x"] - friendly_x) ** 2 + (enemy["y"] - friendly_y) ** 2) / main.DRONE_SPEED)
+
+# Helpers
+
+@pytest.fixture(autouse=True)
+def fresh_world():
+    main.world["drones"] = main.DroneArrays()
+    main.world["command_groups"] = {}
+    main.world["next_command_id"] = 1
+
+def tick(n: int = 1):
+    for _ in range(n):
+        main.step_drones(main.world["drones"])
+        main.check_collisions()
+
+def enemy_record(arrays: main.DroneArrays, i: int) -> dict:
+    """Plain-value view of enemy row i, as the reference functions expect it."""
+    return {
+        "x": float(arrays.x[i]),
+        "y": float(arrays.y[i]),
+        "pattern": main.PATTERN_NAMES[arrays.pattern[i]],
+        "pattern_data": main.pattern_data_view(arrays, i),
+    }
+
+# Tests
+
+@pytest.mark.parametrize("seed", range(40))
+def test_collisions_match_nested_loop(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(2, 300))
+    # A small area keeps the world dense, so many drones touch several opponents
+    size = float(rng.uniform(30, 400))
+    arrays = main.world["drones"]
+    for k in range(n):
+        arrays.add(
+            f"d{k}",
+            x=rng.uniform(0, size),
+            y=rng.uniform(0, size),
+            team=main.TEAM_ENEMY if rng.random() < 0.5 else main.TEAM_FRIENDLY,
+        )
+    # Compare on the float32 positions the arrays actually hold
+    drones = [
+        {"id": arrays.ids[i], "team": main.TEAM_NAMES[arrays.team[i]], "x": float(arrays.x[i]), "y": float(arrays.y[i])}
+        for i in range(arrays.len)
+    ]
+    expected = reference_collisions(drones)
+    
+    main.update_grid(arrays)
+    main.check_collisions()
+    
+    removed = {d["id"] for d in drones} - set(main.world["drones"].ids)
+    assert removed == expected
+
+@pytest.mark.parametrize("seed", range(20))
+def test_intercept_matches_time_scan(seed):
+    rng = np.random.default_rng(seed)
+    main.init_drones()
+    # Move the enemies to an arbitrary phase of their patterns
+    tick(int(rng.integers(0, 2000)))
+    arrays = main.world["drones"]
+    
+    for i in np.flatnonzero(arrays.team[:arrays.len] == main.TEAM_ENEMY).tolist():
+        enemy = enemy_record(arrays, i)
+        for t in (0.0, 0.3, 2.7, 11.1, 29.9):
+            assert main.predict_enemy_position(arrays, i, t) == pytest.approx(reference_predict(enemy, t), abs=1e-6)
+        
+        for _ in range(10):
+            friendly_x, friendly_y = rng.uniform(0, 1000, 2)
+            expected = reference_intercept(friendly_x, friendly_y, enemy)
+            assert main.calculate_intercept_point(friendly_x, friendly_y, arrays, i) == pytest.approx(expected, abs=1e-6)
+
+def test_group_move_disperses_then_idles():
+    main.init_drones()
+    group = ["drone_1", "drone_2", "drone_3", "drone_4"]
+    target_x, target_y = 300.0, 500.0
+    # Keep the enemies out of the way so no drone of the group is lost to a collision
+    arrays = main.world["drones"]
+    arrays.remove(np.flatnonzero(arrays.team[:arrays.len] == main.TEAM_ENEMY).tolist())
+    
+    asyncio.run(main.send_command(main.Command(drone_ids=group, target_x=target_x, target_y=target_y)))
+    arrays = main.world["drones"]
+    rows = [arrays.id_to_index[drone_id] for drone_id in group]
+    command_id = int(arrays.command_id[rows[0]])
+    assert command_id in main.world["command_groups"]
+    
+    modes_seen = set()
+    for _ in range(1000):
+        tick()
+        modes_seen.update(arrays.mode[rows].tolist())
+        if np.all(arrays.mode[rows] == main.MODE_IDLE):
+            break
+    
+    assert modes_seen >= {main.MODE_MOVING, main.MODE_DISPERSING, main.MODE_IDLE}
+    assert np.all(arrays.mode[rows] == main.MODE_IDLE)
+    assert np.all(arrays.command_id[rows] == -1)
+    assert command_id not in main.world["command_groups"]
+    
+    # Every drone settles on its own slot of the grid around the target
+    slot_xs, slot_ys = main.calculate_grid_positions(len(group), target_x, target_y)
+    slots = set(zip(slot_xs.tolist(), slot_ys.tolist()))
+    landed = set(zip(arrays.x[rows].tolist(), arrays.y[rows].tolist()))
+    assert landed == slots
@@ -3,6 +3,7 @@ import './App.css'
 
 const API_BASE = 'http://localhost:8000'
 const POLL_INTERVAL = 50 // ms (20 updates per second for smooth UI)
+const FULL_REFRESH_INTERVAL = 500 // ms between full /world fetches while the /ws stream is live
 
 function App() {
   const [drones, setDrones] = useState([])
@@ -75,21 +76,81 @@ function App() {
     return `${funcName}(${argPairs.join(', ')})`
   }
 
-  // Poll backend for world state
+  // Stream drone state from the backend, polling /world for full records
   useEffect(() => {
+    let socket = null
+    let unmounted = false
+    let roster = null
+    // Names of the mode/team codes in /ws frames (backend physics.MODE_NAMES/TEAM_NAMES), sent by /world
+    let frameCodes = null
+    let fetching = false
+    let lastFullFetch = 0
+
     const fetchWorld = async () => {
+      if (fetching) return
+      fetching = true
+      lastFullFetch = Date.now()
       try {
         const response = await fetch(`${API_BASE}/world`)
         const data = await response.json()
+        roster = data.roster
+        frameCodes = data.frame_codes
         setDrones(data.drones || [])
       } catch (error) {
         console.error('Failed to fetch world state:', error)
+      } finally {
+        fetching = false
+      }
+    }
+
+    // Binary /ws frames carry position, velocity, mode and team for every drone each tick;
+    // ids, targets and bases still come from /world
+    const applyFrame = (buffer) => {
+      const view = new DataView(buffer)
+      const count = view.getUint32(0, true)
+      if (view.getUint32(4, true) !== roster) {
+        // Drones were added or removed, so rows no longer line up with our list
+        fetchWorld()
+        return
+      }
+      const byteOffset = 8 + 16 * count
+      setDrones(prev => prev.length !== count ? prev : prev.map((drone, i) => ({
+        ...drone,
+        x: view.getFloat32(8 + 4 * i, true),
+        y: view.getFloat32(8 + 4 * (count + i), true),
+        vx: view.getFloat32(8 + 4 * (2 * count + i), true),
+        vy: view.getFloat32(8 + 4 * (3 * count + i), true),
+        mode: frameCodes.mode[view.getUint8(byteOffset + i)],
+        team: frameCodes.team[view.getUint8(byteOffset + count + i)]
+      })))
+    }
+
+    const connect = () => {
+      socket = new WebSocket(`${API_BASE.replace(/^http/, 'ws')}/ws`)
+      socket.binaryType = 'arraybuffer'
+      socket.onmessage = (event) => applyFrame(event.data)
+      socket.onclose = () => {
+        socket = null
+        if (!unmounted) setTimeout(connect, 1000)
+      }
+    }
+
+    // Fall back to fast polling whenever the stream is down
+    const poll = () => {
+      const streaming = socket && socket.readyState === WebSocket.OPEN
+      if (!streaming || Date.now() - lastFullFetch >= FULL_REFRESH_INTERVAL) {
+        fetchWorld()
       }
     }
 
     fetchWorld()
-    const interval = setInterval(fetchWorld, POLL_INTERVAL)
-    return () => clearInterval(interval)
+    connect()
+    const interval = setInterval(poll, POLL_INTERVAL)
+    return () => {
+      unmounted = true
+      clearInterval(interval)
+      if (socket) socket.close()
+    }
   }, [])
 
   // Fetch bases on mount